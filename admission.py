@@ -0,0 +1,298 @@
+# admission.py
+
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Union
+
+from fastapi import Form, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from starlette.datastructures import FormData
+
+from metrics import ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+from sqlite_store import SQLiteFile
+
+
+# "memory" limits each process on its own; "sqlite" shares buckets and the in-flight budget between workers
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory")
+ADMISSION_SQLITE_PATH = os.getenv("ADMISSION_SQLITE_PATH", "admission.db")
+
+# Per user: LLM calls per minute, and how many may be spent at once after a quiet period (0 = no limit)
+RATE_LIMIT_CALLS_PER_MINUTE = float(os.getenv("RATE_LIMIT_CALLS_PER_MINUTE", "40"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "24"))
+
+# LLM calls allowed in flight overall (0 = no limit). Requests over budget wait up to
+# ADMISSION_QUEUE_SECONDS for room before being turned away.
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "64"))
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "10"))
+
+# In-flight reservations of a worker that died are dropped after this long
+ADMISSION_LEASE_SECONDS = 600
+
+# Idle buckets refill to full, so only this many are remembered
+MAX_BUCKETS = 100000
+
+_POLL_SECONDS = 0.05
+
+
+class LimiterState(ABC):
+    """Token buckets and the in-flight budget. Subclasses decide where the state lives."""
+
+    @abstractmethod
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        """Take `cost` tokens from key's bucket (refilled at `rate` per second, up to `burst`).
+
+        Returns 0 if they were taken, else the seconds until they would be. A cost above the
+        burst is admitted once the bucket is full, leaving it in debt.
+        """
+
+    @abstractmethod
+    def refund(self, key: str, cost: float, burst: float) -> None:
+        ...
+
+    @abstractmethod
+    def acquire(self, cost: int, limit: int) -> Optional[str]:
+        """Reserve `cost` of the in-flight budget; returns a lease id, or None if it is used up.
+        A cost above the limit is admitted once nothing else is in flight."""
+
+    @abstractmethod
+    def release(self, lease_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def in_flight(self) -> int:
+        ...
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def _wait_for(tokens: float, cost: float, rate: float, burst: float) -> float:
+    needed = min(cost, burst)
+    return max(0.0, needed - tokens) / rate
+
+
+class MemoryLimiterState(LimiterState):
+    """State in this process. With several workers, each enforces the limits on its own."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, tuple] = {}  # key -> (tokens, updated)
+        self._leases: Dict[str, tuple] = {}  # lease id -> (cost, expires_at)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            wait = _wait_for(tokens, cost, rate, burst)
+            if wait == 0:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > MAX_BUCKETS:
+                self._prune(now, rate, burst)
+        return wait
+
+    def refund(self, key: str, cost: float, burst: float) -> None:
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(burst, tokens + cost), updated)
+
+    def acquire(self, cost: int, limit: int) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            used = sum(lease_cost for lease_cost, expires_at in self._leases.values() if expires_at > now)
+            if used and used + cost > limit:
+                return None
+            lease_id = uuid.uuid4().hex
+            self._leases[lease_id] = (cost, now + ADMISSION_LEASE_SECONDS)
+        return lease_id
+
+    def release(self, lease_id: str) -> None:
+        with self._lock:
+            self._leases.pop(lease_id, None)
+
+    def in_flight(self) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(cost for cost, expires_at in self._leases.values() if expires_at > now)
+
+    def _prune(self, now: float, rate: float, burst: float) -> None:
+        # Must hold self._lock. Buckets that have refilled are the same as no bucket.
+        full = [key for key, (tokens, updated) in self._buckets.items()
+                if _refill(tokens, updated, now, rate, burst) >= burst]
+        for key in full:
+            del self._buckets[key]
+
+
+class SQLiteLimiterState(SQLiteFile, LimiterState):
+    """State in a SQLite file, so every worker (or node, on a shared volume) enforces one set of limits."""
+
+    def __init__(self, path: str = ADMISSION_SQLITE_PATH):
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated);
+            CREATE TABLE IF NOT EXISTS leases (
+                lease_id TEXT PRIMARY KEY,
+                cost INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.time()
+        with self._transaction():
+            row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*row, now, rate, burst) if row is not None else burst
+            wait = _wait_for(tokens, cost, rate, burst)
+            if wait == 0:
+                tokens -= cost
+            self._conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now)
+            )
+            # Anything idle long enough to have refilled completely
+            self._conn.execute("DELETE FROM buckets WHERE updated < ?", (now - burst / rate - 60,))
+        return wait
+
+    def refund(self, key: str, cost: float, burst: float) -> None:
+        with self._transaction():
+            self._conn.execute("UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE key = ?", (burst, cost, key))
+
+    def acquire(self, cost: int, limit: int) -> Optional[str]:
+        now = time.time()
+        with self._transaction():
+            self._conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            used = self._conn.execute("SELECT COALESCE(SUM(cost), 0) FROM leases").fetchone()[0]
+            if used and used + cost > limit:
+                return None
+            lease_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO leases (lease_id, cost, expires_at) VALUES (?, ?, ?)",
+                (lease_id, cost, now + ADMISSION_LEASE_SECONDS),
+            )
+        return lease_id
+
+    def release(self, lease_id: str) -> None:
+        with self._transaction():
+            self._conn.execute("DELETE FROM leases WHERE lease_id = ?", (lease_id,))
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(cost), 0) FROM leases WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+
+def create_limiter_state() -> LimiterState:
+    """Build the limiter backend selected by ADMISSION_BACKEND."""
+    if ADMISSION_BACKEND == "memory":
+        return MemoryLimiterState()
+    if ADMISSION_BACKEND == "sqlite":
+        return SQLiteLimiterState()
+    raise ValueError(f"Unknown ADMISSION_BACKEND: {ADMISSION_BACKEND!r}")
+
+
+Cost = Union[int, Callable[[FormData], int]]
+
+
+class Admission:
+    """Admission control for endpoints that call the LLM, applied as a FastAPI dependency.
+
+    Each request costs roughly the number of LLM calls it makes. It is charged to its user's
+    token bucket (429 with Retry-After when empty) and then holds that much of the in-flight
+    budget until its response, streamed or not, has been sent. When the budget is used up the
+    request waits up to ADMISSION_QUEUE_SECONDS, then gets a 503 with Retry-After. Requests
+    rejected with a 4xx are refunded, as is whatever a request reports it didn't use
+    (record_calls). The state may live in a file shared with other workers, so it is only
+    touched from worker threads, never on the event loop.
+    """
+
+    def __init__(self, state: LimiterState, calls_per_minute: float = RATE_LIMIT_CALLS_PER_MINUTE,
+                 burst: float = RATE_LIMIT_BURST, max_in_flight: int = ADMISSION_MAX_INFLIGHT,
+                 queue_seconds: float = ADMISSION_QUEUE_SECONDS):
+        self.state = state
+        self.rate = calls_per_minute / 60
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.queue_seconds = queue_seconds
+
+    def limit(self, endpoint: str, cost: Cost, hold_in_flight: bool = True):
+        """Dependency admitting a request to `endpoint`. `cost` may depend on the submitted form
+        (e.g. the number of job descriptions), and may raise HTTPException to turn the request away
+        before anything is charged. Background submissions pass hold_in_flight=False: they only
+        spend tokens, their work is bounded by the job workers."""
+
+        async def dependency(request: Request, user_id: str = Form(...)):
+            calls = cost(await request.form()) if callable(cost) else cost
+            calls = max(1, int(calls))
+
+            wait = 0
+            if self.rate > 0:
+                wait = await asyncio.to_thread(self.state.take, f"user:{user_id}", calls, self.rate, self.burst)
+            if wait > 0:
+                ADMISSION_REJECTIONS.inc(endpoint=endpoint, reason="rate_limited")
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests. Please wait a moment and try again.",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+            lease_id = None
+            if hold_in_flight and self.max_in_flight > 0:
+                lease_id = await self._acquire(calls)
+                if lease_id is None:
+                    await self._refund(user_id, calls)
+                    ADMISSION_REJECTIONS.inc(endpoint=endpoint, reason="overloaded")
+                    raise HTTPException(
+                        status_code=503,
+                        detail="The service is busy. Please try again shortly.",
+                        headers={"Retry-After": str(max(1, math.ceil(self.queue_seconds)))},
+                    )
+            try:
+                yield
+            except (HTTPException, RequestValidationError) as e:
+                # Turned away (bad upload, no resume, ...): the client's mistake, but no LLM calls made
+                if isinstance(e, RequestValidationError) or e.status_code < 500:
+                    await self._refund(user_id, calls)
+                raise
+            else:
+                used = getattr(request.state, "llm_calls", None)
+                if used is not None and used < calls:
+                    await self._refund(user_id, calls - used)
+            finally:
+                if lease_id is not None:
+                    await asyncio.to_thread(self.state.release, lease_id)
+
+        return dependency
+
+    @staticmethod
+    def record_calls(request: Request, calls: int) -> None:
+        """Report the LLM calls a request actually made (e.g. none for a cached result), so the
+        rest of what it was charged is refunded once it succeeds."""
+        request.state.llm_calls = calls
+
+    async def charge(self, user_id: str, calls: int) -> None:
+        """Charge LLM calls made outside an admitted request (e.g. background chat compaction) to the
+        user's bucket. Never rejected: the bucket may go into debt, which delays their next request."""
+        if self.rate > 0:
+            # A negative refund takes the tokens without checking the balance
+            await asyncio.to_thread(self.state.refund, f"user:{user_id}", -calls, self.burst)
+
+    async def _refund(self, user_id: str, calls: int) -> None:
+        if self.rate > 0:
+            await asyncio.to_thread(self.state.refund, f"user:{user_id}", calls, self.burst)
+
+    async def _acquire(self, calls: int) -> Optional[str]:
+        start = time.perf_counter()
+        deadline = start + self.queue_seconds
+        while True:
+            lease_id = await asyncio.to_thread(self.state.acquire, calls, self.max_in_flight)
+            if lease_id is not None or time.perf_counter() >= deadline:
+                ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+                return lease_id
+            await asyncio.sleep(_POLL_SECONDS)
@@ -1,32 +1,29 @@
 # analysis.py
 
+import asyncio
+import difflib
+import json
 import os
+import re
+import time
 import warnings
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Collection, Dict, List, Optional, Sequence, Tuple
 
-import fitz  # PyMuPDF
-
-# Langchain
-from langchain.chains import LLMChain, SequentialChain
-from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
+from llm_client import LazyChain
+from local_checks import LOCAL_CHECKS, SpellChecker, run_local_checks
+from metrics import LLM_SECONDS_SAVED, LOCAL_CHECK_RESULTS, STAGE_SECONDS, span
+from result_cache import template_version
+from resume_parser import CONTACT_SECTION, SECTION_HEADINGS
 
 warnings.filterwarnings("ignore")
 
 
-# Load API key from env variables
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# Define the GPT Model
-llm_model = "gpt-4o-mini"
-llm = ChatOpenAI(temperature=0.7, model=llm_model)
-
-
 ########### Prompts & chains #####################
 
 # Summarization
-summary_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+summary_prompt = """
     You are a professional, friendly, and detail-oriented career assistant. \
     Speak directly to the candidate using “you.” Be specific, constructive, and easy to understand. \
     Summarize the resume below in 3–5 concise sentences. Make it easy for the reader to read. \
@@ -36,13 +33,10 @@ summary_prompt = PromptTemplate(
     This summary is meant to give the candidate an idea of what a recruiter would see in their resume. \
     \n\n{resume}
     """
-)
-summary_chain = LLMChain(llm=llm, prompt=summary_prompt, output_key="summary")
+summary_chain = LazyChain("analysis", summary_prompt, output_key="summary")
 
 # Rating
-rating_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+rating_prompt = """
     You are a professional, friendly, and detail-oriented career assistant. \
     Be specific, constructive, and easy to understand. \
 
@@ -115,13 +109,10 @@ rating_prompt = PromptTemplate(
 
     {resume}
     """
-)
-rating_chain = LLMChain(llm=llm, prompt=rating_prompt, output_key="rating")
+rating_chain = LazyChain("analysis", rating_prompt, output_key="rating")
 
 # Personal Info Extraction
-info_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+info_prompt = """
     Extract the following information from the resume: Full Name, Email, Phone Number, Location (city/state), \
     and relevant links (LinkedIn, GitHub, Portfolio, etc.).  
     Use this format (one per line, bold the titles):  
@@ -137,14 +128,10 @@ info_prompt = PromptTemplate(
     If anything is missing, there may be an issue with your formatting: \n\n" \
     \n\n{resume}
     """
-
-)
-info_chain = LLMChain(llm=llm, prompt=info_prompt, output_key="personal_info")
+info_chain = LazyChain("analysis", info_prompt, output_key="personal_info")
 
 # Job Role Suggestion
-roles_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+roles_prompt = """
     You are a professional, friendly, and detail-oriented career assistant. \
     Speak directly to the candidate using “you.” Be specific, constructive, and easy to understand. \
     Based on the resume below, suggest 5 to 10 job roles the person is suited for. \
@@ -154,15 +141,10 @@ roles_prompt = PromptTemplate(
     Only output the necessary text for this task (don't open with a statement or close with a statement). \
     Here is the resume:\n\n{resume}
     """
-
-    
-)
-roles_chain = LLMChain(llm=llm, prompt=roles_prompt, output_key="job_roles")
+roles_chain = LazyChain("analysis", roles_prompt, output_key="job_roles")
 
 # Strengths
-strengths_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+strengths_prompt = """
     You are a professional, friendly, and detail-oriented career assistant. \
     Speak directly to the candidate using “you.” Be specific, constructive, and easy to understand. \
     Based on the resume, list 3–5 specific strengths \
@@ -173,13 +155,10 @@ strengths_prompt = PromptTemplate(
     Only output the necessary text for this task (don't open with a statement or close with a statement). \
     \n\n{resume}
     """
-)
-strengths_chain = LLMChain(llm=llm, prompt=strengths_prompt, output_key="strengths")
+strengths_chain = LazyChain("analysis", strengths_prompt, output_key="strengths")
 
 # Improvements
-improve_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+improve_prompt = """
     You are a professional, friendly, and detail-oriented career assistant. \
     Speak directly to the candidate using “you.” Be specific, constructive, and easy to understand. \
     Suggest 2–5 specific improvements for the resume. \
@@ -192,14 +171,10 @@ improve_prompt = PromptTemplate(
     Only output the necessary text for this task (don't open with a statement or close with a statement). \
     \n\n{resume}
     """
-
-)
-improve_chain = LLMChain(llm=llm, prompt=improve_prompt, output_key="improvements")
+improve_chain = LazyChain("analysis", improve_prompt, output_key="improvements")
 
 # Career Suggestions
-tips_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+tips_prompt = """
     You are a professional, friendly, and detail-oriented career assistant. \
     Speak directly to the candidate using “you.” Be specific, constructive, and easy to understand. \
     Based on this resume, provide 3–5 personalized career tips. \
@@ -211,13 +186,10 @@ tips_prompt = PromptTemplate(
     Only output the necessary text for this task (don't open with a statement or close with a statement). \
     \n\n{resume}
     """
-)
-tips_chain = LLMChain(llm=llm, prompt=tips_prompt, output_key="career_tips")
+tips_chain = LazyChain("analysis", tips_prompt, output_key="career_tips")
 
 # Spelling Check
-spelling_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+spelling_prompt = """
     Check this resume for spelling/grammatical errors. If there are errors, state where the error \
     is and the necessary change. If you are listing errors, make sure to format in a visually appealing manner. \
     If there are no errors, simply output 'Good job! No spelling errors detected.' \
@@ -226,42 +198,367 @@ spelling_prompt = PromptTemplate(
 
     Here is the resume:\n\n{resume}
     """
+spelling_chain = LazyChain("analysis", spelling_prompt, output_key="spelling")
 
-)
-spelling_chain = LLMChain(llm=llm, prompt=spelling_prompt, output_key="spelling")
 
 
 
 
 
+############ Single-pass prompt #################
 
-############ Sequential chain #################
+# Same eight sections from one call, so the resume is only sent (and paid for) once
+single_pass_prompt = """
+    You are a professional, friendly, and detail-oriented career assistant. \
+    Speak directly to the candidate using “you.” Be specific, constructive, and easy to understand. \
+    Try to be as hyperspecific and as personalized to the resume and candidate as possible. \
+    Do not suggest visual layout or formatting changes.
+
+    Analyze the resume below and respond with a single JSON object with exactly these keys. \
+    Every value is a markdown string:
+
+    - "summary": 3–5 concise sentences on the candidate's background, relevant experience, technical and soft skills, \
+    and notable achievements, as a recruiter would see them (e.g., "You graduated with...").
+    - "rating": Start with the line **Overall Rating: __%** (0–100%). Then, after a divider, assess personal information, \
+    summary, work experience, education, skills and projects, and writing quality. 90–100% is a fantastic resume for a very \
+    marketable candidate, 80–89% well structured, 70–79% decent with some issues, below 70% significantly lacking. \
+    End with a short, hyper-personalized rationale for the rating.
+    - "personal_info": Lead with "This is the personal information we were able to extract from your resume. \
+    If anything is missing, there may be an issue with your formatting:" then one bolded line each for Name, Email, \
+    Phone Number, Location, LinkedIn and Other Links. Only extract what's clearly present; leave missing items blank.
+    - "job_roles": Lead with "Here are some potential job roles you could pursue based on your resume:" then 5 to 10 \
+    job roles, each with a 1–2 sentence explanation of the role and fit.
+    - "strengths": Lead with "These are some of your personal stengths as an applicant:" then 3–5 specific strengths, \
+    each 1–2 sentences with a bolded header. Avoid vague or generic praise.
+    - "career_tips": Lead with "Here's a list of career tips you could implement to improve your chances of being hired:" \
+    then 3–5 actionable tips (projects, experience, resources, networking) they have not already completed.
+    - "improvements": Lead with "These are some improvements you could make to enhance your resume:" then 2–5 practical \
+    improvements to clarity, completeness, or content. No formatting or date-timing suggestions. If the resume is already \
+    strong, say so; don't make up problems.
+    - "spelling": List each spelling or grammatical error and the necessary change, formatted in a visually appealing \
+    manner. Ignore spacing, formatting and minor phrasing. If there are none, output 'Good job! No spelling errors detected.'
+
+    Respond only in raw JSON format.
+
+    Here is the resume:
 
+    {resume}
+    """
 
 
-# Combine chains into a sequential pipeline
-pipeline = SequentialChain(
-    chains=[summary_chain, rating_chain, info_chain, roles_chain, strengths_chain, tips_chain, improve_chain, spelling_chain],
-    input_variables=["resume"],
-    output_variables=["summary", "rating", "personal_info", "job_roles", "strengths", "career_tips", 
-                      "improvements", "spelling"],
-    verbose=True
+############ Concurrent pipeline #################
+
+# Every section chain only reads {resume}, so they are fanned out side by side
+# instead of one after another. Latency is then roughly the slowest chain.
+ANALYSIS_CHAINS = [summary_chain, rating_chain, info_chain, roles_chain, strengths_chain, tips_chain,
+                   improve_chain, spelling_chain]
+
+# "multi" runs one chain per section; "single" asks for every section in one structured call and
+# only falls back to the per-section chains for sections that come back missing or malformed
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "multi")
+
+# JSON schema the single-pass reply must follow: one required string per section
+SINGLE_PASS_SCHEMA = {
+    "name": "resume_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {chain.output_key: {"type": "string"} for chain in ANALYSIS_CHAINS},
+        "required": [chain.output_key for chain in ANALYSIS_CHAINS],
+        "additionalProperties": False,
+    },
+}
+
+single_pass_chain = LazyChain(
+    "analysis",
+    single_pass_prompt,
+    llm_kwargs={"response_format": {"type": "json_schema", "json_schema": SINGLE_PASS_SCHEMA}},
 )
 
+# Changes whenever a prompt in use is edited; part of the result cache key
+PROMPT_VERSION = template_version(
+    *[chain.template for chain in ANALYSIS_CHAINS], *([single_pass_prompt] if ANALYSIS_MODE == "single" else [])
+)
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """Extract plain text from uploaded PDF bytes."""
-    doc = fitz.open(stream=file_bytes, filetype="pdf")
-    
-    if doc.page_count > 3:
-        raise ValueError("Your resume exceeds the 3-page limit. Please upload a shorter version.")
-    
-    text = "\n".join([page.get_text() for page in doc])
-    doc.close()
-    return text
-
-def analyze_resume(file_bytes: bytes) -> dict:
-    """Run the LangChain pipeline on extracted resume text."""
-    resume_text = extract_text_from_pdf(file_bytes)
-    return pipeline({"resume": resume_text})
-
+# Max section chains in flight per request, and seconds each one may take
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "8"))
+ANALYSIS_SECTION_TIMEOUT = float(os.getenv("ANALYSIS_SECTION_TIMEOUT", "60"))
+ANALYSIS_SINGLE_PASS_TIMEOUT = float(os.getenv("ANALYSIS_SINGLE_PASS_TIMEOUT", "120"))
+
+
+def analysis_calls() -> int:
+    """LLM calls a full analysis is expected to make: one in single-pass mode, otherwise one per
+    section that the enabled local checks don't answer. Local checks can still defer to the LLM,
+    so this is an estimate, used to charge /analyze against the rate limit."""
+    if ANALYSIS_MODE == "single":
+        return 1
+    local = LOCAL_CHECKS & {"personal_info", "spelling"}
+    if SpellChecker is None:
+        local -= {"spelling"}
+    return len(ANALYSIS_CHAINS) - len(local)
+
+
+def section_inputs(resume_text: str, sections: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Text each section chain reads. Personal info only needs the contact block and spelling can skip
+    it (names, emails and URLs are not words), so both get less input when sections were detected.
+    Every other chain, or an unstructured resume, gets the full text."""
+    inputs = {chain.output_key: resume_text for chain in ANALYSIS_CHAINS}
+    if not sections or set(sections) == {CONTACT_SECTION}:
+        return inputs
+    if sections.get(CONTACT_SECTION):
+        inputs[info_chain.output_key] = sections[CONTACT_SECTION]
+    inputs[spelling_chain.output_key] = "\n\n".join(
+        text for name, text in sections.items() if name != CONTACT_SECTION
+    )
+    return inputs
+
+
+@dataclass
+class SectionResult:
+    """Outcome of one section chain: its output, or why it failed, and how long it took."""
+    key: str
+    content: Optional[str]
+    error: Optional[str]
+    seconds: float
+
+
+async def _run_section(chain: LazyChain, resume_text: str, semaphore: asyncio.Semaphore) -> SectionResult:
+    """Run one section chain once a concurrency slot is free, bounded by the section timeout."""
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            with span(f"chain:{chain.output_key}"):
+                outputs = await asyncio.wait_for(chain.ainvoke({"resume": resume_text}), ANALYSIS_SECTION_TIMEOUT)
+            content = outputs[chain.output_key]
+            return SectionResult(chain.output_key, content, None, time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            error = f"The '{chain.output_key}' section timed out after {ANALYSIS_SECTION_TIMEOUT:g}s."
+        except Exception as e:
+            error = f"The '{chain.output_key}' section failed: {str(e)}"
+        return SectionResult(chain.output_key, None, error, time.perf_counter() - start)
+
+
+def parse_single_pass(raw_output: str) -> Dict[str, str]:
+    """Sections from a single-pass reply that are present and non-empty. Anything else is left out
+    so that only those sections get retried."""
+    cleaned = re.sub(r"^```json|```$", "", raw_output.strip(), flags=re.MULTILINE).strip()
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    sections = {}
+    for chain in ANALYSIS_CHAINS:
+        value = data.get(chain.output_key)
+        if isinstance(value, str) and value.strip():
+            sections[chain.output_key] = value.strip()
+    return sections
+
+
+async def _run_single_pass(resume_text: str) -> Tuple[Dict[str, str], float]:
+    """All sections from one structured call. A failed call just means every section is retried."""
+    start = time.perf_counter()
+    try:
+        with span("chain:single_pass"):
+            outputs = await asyncio.wait_for(
+                single_pass_chain.ainvoke({"resume": resume_text}), ANALYSIS_SINGLE_PASS_TIMEOUT
+            )
+        sections = parse_single_pass(outputs[single_pass_chain.output_key])
+    except Exception:
+        sections = {}
+    return sections, time.perf_counter() - start
+
+
+def _local_sections(inputs: Dict[str, str], links: Sequence[str]) -> Dict[str, SectionResult]:
+    """Sections answered by local_checks, counting the LLM calls (and their mean latency) avoided."""
+    results = {}
+    for check in run_local_checks(inputs, links):
+        if check.content is None:
+            LOCAL_CHECK_RESULTS.inc(section=check.key, outcome="llm")
+            continue
+        LOCAL_CHECK_RESULTS.inc(section=check.key, outcome="local")
+        results[check.key] = SectionResult(check.key, check.content, None, check.seconds)
+        llm_seconds = STAGE_SECONDS.mean(stage=f"chain:{check.key}")
+        if llm_seconds is not None:
+            LLM_SECONDS_SAVED.inc(max(0.0, llm_seconds - check.seconds), section=check.key)
+    return results
+
+
+async def iter_sections(
+    resume_text: str,
+    sections: Optional[Dict[str, str]] = None,
+    links: Sequence[str] = (),
+    keys: Optional[Collection[str]] = None,
+) -> AsyncIterator[SectionResult]:
+    """Run all section chains concurrently, yielding each one as soon as it finishes.
+
+    `sections` are the resume's detected sections, used to trim what some chains read, and `links`
+    its PDF link URIs. `keys` limits the run to those output sections. Sections that local checks
+    can answer (personal info, spelling) are yielded first without an LLM call. In single-pass mode,
+    the sections from the structured call come next and only the missing ones are run through
+    their own chains; a partial run (`keys`) skips the single call.
+    """
+    inputs = section_inputs(resume_text, sections)
+    if keys is not None:
+        inputs = {key: text for key, text in inputs.items() if key in keys}
+    # Dictionary lookups and regexes over the whole resume: CPU work, kept off the event loop
+    done = await asyncio.to_thread(_local_sections, inputs, links)
+    for result in done.values():
+        yield result
+
+    if ANALYSIS_MODE == "single" and keys is None:
+        parsed, seconds = await _run_single_pass(resume_text)
+        for key, content in parsed.items():
+            if key not in done:
+                done[key] = SectionResult(key, content, None, seconds)
+                yield done[key]
+
+    chains = [chain for chain in ANALYSIS_CHAINS if chain.output_key in inputs and chain.output_key not in done]
+    semaphore = asyncio.Semaphore(max(1, ANALYSIS_MAX_CONCURRENCY))
+    tasks = [asyncio.create_task(_run_section(chain, inputs[chain.output_key], semaphore)) for chain in chains]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop the remaining chains if the caller gives up early (failure or client disconnect)
+        for task in tasks:
+            task.cancel()
+
+
+async def run_pipeline(
+    resume_text: str, sections: Optional[Dict[str, str]] = None, links: Sequence[str] = ()
+) -> dict:
+    """Run all section chains concurrently and merge them into one result dict."""
+    outputs = {}
+    async with aclosing(iter_sections(resume_text, sections, links)) as results:
+        async for section in results:
+            if section.error:
+                raise RuntimeError(section.error)
+            outputs[section.key] = section.content
+
+    result = {"resume": resume_text}
+    for chain in ANALYSIS_CHAINS:
+        result[chain.output_key] = outputs[chain.output_key]
+    return result
+
+
+############ Incremental re-analysis #################
+
+# Resume sections each output reads. personal_info and spelling follow section_inputs; the
+# others are judgements about the candidate as a whole, minus details that don't move them.
+_ALL_SECTIONS = frozenset([CONTACT_SECTION, *SECTION_HEADINGS])
+SECTION_DEPENDENCIES = {
+    "summary": frozenset({"summary", "experience", "education", "skills", "projects"}),
+    "rating": _ALL_SECTIONS,
+    "personal_info": frozenset({CONTACT_SECTION}),
+    "job_roles": frozenset({"summary", "experience", "education", "skills", "projects"}),
+    "strengths": frozenset({"summary", "experience", "education", "skills", "projects", "other"}),
+    "career_tips": frozenset({"experience", "education", "skills", "projects", "other"}),
+    "improvements": _ALL_SECTIONS,
+    "spelling": _ALL_SECTIONS - {CONTACT_SECTION},
+}
+
+# Outputs that quote the text itself rerun on any change to what they read. The others only rerun
+# once a section they read changed by more than this fraction of its characters, so fixing a
+# typo or a date doesn't regenerate the whole analysis.
+EXACT_OUTPUTS = frozenset({"personal_info", "spelling"})
+ANALYSIS_CHANGE_THRESHOLD = float(os.getenv("ANALYSIS_CHANGE_THRESHOLD", "0.05"))
+
+
+def section_changes(old_sections: Dict[str, str], new_sections: Dict[str, str]) -> Dict[str, float]:
+    """Fraction of each resume section that changed (0 = identical, 1 = added, removed or rewritten)."""
+    changes = {}
+    for name in set(old_sections) | set(new_sections):
+        old, new = old_sections.get(name, ""), new_sections.get(name, "")
+        if old != new:
+            changes[name] = 1.0 - difflib.SequenceMatcher(None, old, new, autojunk=False).ratio()
+    return changes
+
+
+def _structured(sections: Optional[Dict[str, str]]) -> bool:
+    return bool(sections) and set(sections) != {CONTACT_SECTION}
+
+
+def plan_reanalysis(
+    old_text: str, old_sections: Optional[Dict[str, str]], new_text: str, new_sections: Optional[Dict[str, str]]
+) -> List[str]:
+    """Output sections that need to be recomputed after a resume went from old to new.
+
+    Resumes without detected sections on either side are compared as one block that every
+    output depends on.
+    """
+    if _structured(old_sections) and _structured(new_sections):
+        changes = section_changes(old_sections, new_sections)
+        dependencies = SECTION_DEPENDENCIES
+    else:
+        changes = section_changes({"all": old_text}, {"all": new_text})
+        dependencies = {chain.output_key: frozenset({"all"}) for chain in ANALYSIS_CHAINS}
+
+    recompute = []
+    for chain in ANALYSIS_CHAINS:
+        key = chain.output_key
+        threshold = 0.0 if key in EXACT_OUTPUTS else ANALYSIS_CHANGE_THRESHOLD
+        if any(changes.get(name, 0.0) > threshold for name in dependencies[key]):
+            recompute.append(key)
+    return recompute
+
+
+# The resume text and sections one output was computed from
+AnalysisBase = Tuple[str, Optional[Dict[str, str]]]
+
+
+def reanalysis_keys(
+    resume_text: str,
+    sections: Optional[Dict[str, str]],
+    bases: Dict[str, AnalysisBase],
+    previous_result: Dict[str, str],
+) -> List[str]:
+    """Outputs to recompute for a revised resume: each output is compared with the resume version
+    it was itself computed from (bases, by output key), so small edits that were each below the
+    threshold add up until it reruns. Outputs missing from previous_result or bases rerun too."""
+    plans: Dict[str, List[str]] = {}
+    keys = []
+    for chain in ANALYSIS_CHAINS:
+        key = chain.output_key
+        if key not in previous_result or key not in bases:
+            keys.append(key)
+            continue
+        base_text, base_sections = bases[key]
+        if base_text not in plans:
+            plans[base_text] = plan_reanalysis(base_text, base_sections, resume_text, sections)
+        if key in plans[base_text]:
+            keys.append(key)
+    return keys
+
+
+async def reanalyze_resume(
+    resume_text: str,
+    sections: Optional[Dict[str, str]],
+    links: Sequence[str],
+    bases: Dict[str, AnalysisBase],
+    previous_result: Dict[str, str],
+) -> Tuple[dict, List[str]]:
+    """Analysis of a revised resume that reruns only the outputs its changes affect, reusing
+    previous_result for the rest. Returns the result and the recomputed keys."""
+    keys = reanalysis_keys(resume_text, sections, bases, previous_result)
+    outputs = dict(previous_result)
+    if keys:
+        async with aclosing(iter_sections(resume_text, sections, links, keys=keys)) as results:
+            async for section in results:
+                if section.error:
+                    raise RuntimeError(section.error)
+                outputs[section.key] = section.content
+
+    result = {"resume": resume_text}
+    for chain in ANALYSIS_CHAINS:
+        result[chain.output_key] = outputs[chain.output_key]
+    return result, keys
+
+
+async def analyze_resume(
+    resume_text: str, sections: Optional[Dict[str, str]] = None, links: Sequence[str] = ()
+) -> dict:
+    """Run the LangChain pipeline on extracted resume text (and its sections and links, if known)."""
+    return await run_pipeline(resume_text, sections, links)
@@ -0,0 +1,818 @@
+# benchmark.py
+"""Offline load test: boots the app against fake_llm.py and drives mixed traffic at it.
+
+    python benchmark.py --users 20 --duration 60 --output bench.json
+    python benchmark.py --env ANALYSIS_MODE=single --output single.json
+
+Each virtual user uploads a generated resume, then keeps picking an action from --mix: analyze,
+a short chat session, a job match or a revision. The JSON report has per-endpoint latency
+percentiles, throughput and status codes, upstream LLM calls (total and per task), and the app
+process's memory, so runs can be diffed over time.
+
+    python benchmark.py --startup 5 --latency 0.2
+
+measures cold starts instead: time to import the app (and its slowest imports), until /health
+answers, and until a first chat reply is back.
+
+    python benchmark.py --fanout 5 --latency 1
+
+times /analyze with the section chains run one at a time (ANALYSIS_MAX_CONCURRENCY=1) and side by
+side, next to what the sum and the slowest of the fake's call latencies predict.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import fitz  # PyMuPDF
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ROLES = ["Software Engineer", "Data Analyst", "Product Manager", "Marketing Specialist", "DevOps Engineer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Health", "Stark Industries", "Wayne Logistics"]
+SKILLS = ["Python", "SQL", "Docker", "AWS", "React", "Tableau", "Kubernetes", "Excel", "Figma", "Salesforce",
+          "Terraform", "Pandas", "Java", "Go", "Jira", "Google Analytics"]
+BULLETS = [
+    "Built internal APIs used by {n} teams and cut response times by {p}%.",
+    "Led a migration of {n} services to the cloud, saving ${n}k a year.",
+    "Analyzed customer data to find churn drivers, improving retention by {p}%.",
+    "Mentored {n} junior colleagues and ran weekly code reviews.",
+    "Automated reporting pipelines, saving {n} hours of manual work per week.",
+    "Launched a self-service dashboard adopted by {n} departments.",
+]
+JOB_DESCRIPTIONS = [
+    "Backend engineer to build Python and FastAPI services on AWS. Docker and PostgreSQL required.",
+    "Data analyst with SQL, Tableau and Excel experience to own weekly business reporting.",
+    "Product manager to lead a cross-functional team shipping B2B SaaS features. Agile experience a plus.",
+    "DevOps engineer with Kubernetes, Terraform and CI/CD experience to run our cloud platform.",
+    "Marketing specialist for SEO, Google Analytics and campaign reporting in a fast-growing startup.",
+]
+CHAT_MESSAGES = [
+    "What are the strongest parts of my resume?",
+    "How can I make my experience section more impactful?",
+    "Which skills should I learn next for my target role?",
+    "Is my resume a good fit for a senior position?",
+    "Can you suggest a better summary for me?",
+]
+
+DEFAULT_MIX = "analyze=2,chat=4,jobmatch=3,revision=1"
+
+
+############ Sample data #################
+
+def sample_resume_pdf(rng: random.Random) -> bytes:
+    """A one- or two-page resume with randomized content and the usual sections."""
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 60
+
+    def line(text: str, size: float = 10) -> None:
+        nonlocal page, y
+        if y > page.rect.height - 60:
+            page = doc.new_page()
+            y = 60
+        page.insert_text((60, y), text, fontsize=size)
+        y += size + 6
+
+    first, last = rng.choice(["Jane", "Sam", "Alex", "Priya", "Diego"]), rng.choice(["Doe", "Lee", "Patel", "Garcia"])
+    line(f"{first} {last}", 18)
+    line(f"{first.lower()}.{last.lower()}@example.com | (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)} "
+         f"| Boston, MA")
+    line("SUMMARY", 13)
+    line(f"{rng.choice(ROLES)} with {rng.randint(2, 12)} years of experience delivering measurable results.")
+    line("EXPERIENCE", 13)
+    for _ in range(rng.randint(2, 4)):
+        line(f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)}, {rng.randint(2012, 2020)}-{rng.randint(2021, 2025)}")
+        for bullet in rng.sample(BULLETS, 3):
+            line("- " + bullet.format(n=rng.randint(2, 40), p=rng.randint(5, 60)))
+    line("EDUCATION", 13)
+    line(f"B.S. in {rng.choice(['Computer Science', 'Economics', 'Statistics', 'Marketing'])}, State University")
+    line("SKILLS", 13)
+    line(", ".join(rng.sample(SKILLS, 8)))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+############ Processes #################
+
+def start_process(args: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(args, cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(session: aiohttp.ClientSession, url: str, process: subprocess.Popen, timeout: float,
+                           poll: float = 0.2) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(poll)
+    raise RuntimeError(f"{url} did not become ready within {timeout:g}s")
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in MB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def llm_calls_by_task(metrics_text: str) -> Dict[str, int]:
+    counts = {}
+    for task, value in re.findall(r'^resume_assistant_llm_seconds_count\{task="([^"]+)"\} (\S+)$', metrics_text, re.M):
+        counts[task] = int(float(value))
+    return counts
+
+
+############ Traffic #################
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def post(self, session: aiohttp.ClientSession, endpoint: str, url: str, data: aiohttp.FormData) -> int:
+        start = time.perf_counter()
+        try:
+            async with session.post(url, data=data) as response:
+                await response.read()
+                status = str(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][status] += 1
+        return int(status) if status.isdigit() else 0
+
+
+def form(fields: Dict[str, str], pdf: Optional[bytes] = None) -> aiohttp.FormData:
+    data = aiohttp.FormData()
+    for name, value in fields.items():
+        data.add_field(name, value)
+    if pdf is not None:
+        data.add_field("file", pdf, filename="resume.pdf", content_type="application/pdf")
+    return data
+
+
+async def virtual_user(index: int, base_url: str, session: aiohttp.ClientSession, recorder: Recorder,
+                       mix: Dict[str, float], deadline: float, seed: int, incremental: bool) -> None:
+    rng = random.Random(seed * 1000 + index)
+    user_id = f"bench-{index}"
+    pdf = sample_resume_pdf(rng)
+    await recorder.post(session, "/chatbot/load", f"{base_url}/chatbot/load", form({"user_id": user_id}, pdf))
+
+    actions, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        action = rng.choices(actions, weights)[0]
+        if action == "analyze":
+            fields = {"user_id": user_id, "incremental": str(incremental).lower()}
+            await recorder.post(session, "/analyze", f"{base_url}/analyze", form(fields, pdf))
+        elif action == "chat":
+            for message in rng.sample(CHAT_MESSAGES, 3):
+                if time.monotonic() >= deadline:
+                    break
+                await recorder.post(session, "/chatbot/respond", f"{base_url}/chatbot/respond",
+                                    form({"user_id": user_id, "message": message}))
+        elif action == "jobmatch":
+            fields = {"user_id": user_id, "job_description": rng.choice(JOB_DESCRIPTIONS)}
+            await recorder.post(session, "/jobmatch", f"{base_url}/jobmatch", form(fields))
+        elif action == "revision":
+            await recorder.post(session, "/revision", f"{base_url}/revision", form({"user_id": user_id}))
+        await asyncio.sleep(rng.uniform(0, 0.05))  # a little think time, so users don't move in lockstep
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], duration: float) -> dict:
+    values = sorted(latencies)
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(values),
+        "ok": ok,
+        "errors": len(values) - ok,
+        "status": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(values) / duration, 3),
+        "latency_s": {
+            "mean": round(sum(values) / len(values), 4),
+            "p50": round(percentile(values, 50), 4),
+            "p95": round(percentile(values, 95), 4),
+            "p99": round(percentile(values, 99), 4),
+            "max": round(values[-1], 4),
+        } if values else None,
+    }
+
+
+############ Run #################
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("analyze", "chat", "jobmatch", "revision"):
+            raise ValueError(f"Unknown action in --mix: {name!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def start_fake_llm(args: argparse.Namespace, workdir: str) -> subprocess.Popen:
+    return start_process([
+        sys.executable, "fake_llm.py", "--port", str(args.llm_port), "--latency", str(args.latency),
+        "--jitter", str(args.jitter), "--tokens-per-second", str(args.tokens_per_second),
+        "--completion-tokens", str(args.completion_tokens), "--error-rate", str(args.error_rate),
+        "--seed", str(args.seed),
+    ], dict(os.environ), os.path.join(workdir, "fake_llm.log"))
+
+
+def app_environment(args: argparse.Namespace, workdir: str) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_API_BASE": f"http://127.0.0.1:{args.llm_port}/v1",
+        # Per-user limits would mostly measure the limiter; the global budget stays on
+        "RATE_LIMIT_CALLS_PER_MINUTE": "0",
+        # Keep state files out of the checkout
+        "SESSION_SQLITE_PATH": os.path.join(workdir, "sessions.db"),
+        "SESSION_CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.db"),
+        "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.db"),
+        "ADMISSION_SQLITE_PATH": os.path.join(workdir, "admission.db"),
+    }
+    for assignment in args.env:
+        name, _, value = assignment.partition("=")
+        env[name] = value
+    return env
+
+
+def start_app(args: argparse.Namespace, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    return start_process([
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.app_port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ], env, log_path)
+
+
+def stop_processes(*processes: subprocess.Popen) -> None:
+    for process in processes:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@asynccontextmanager
+async def running_app(args: argparse.Namespace, session: aiohttp.ClientSession, env: Dict[str, str], workdir: str):
+    """The app started with `env` (state files in `workdir`), once /health answers."""
+    os.makedirs(workdir, exist_ok=True)
+    app = start_app(args, env, os.path.join(workdir, "app.log"))
+    try:
+        await wait_until_ready(session, f"http://127.0.0.1:{args.app_port}/health", app, 60)
+        yield app
+    finally:
+        stop_processes(app)
+
+
+def report_info(args: argparse.Namespace) -> dict:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+
+
+def fake_call_seconds(args: argparse.Namespace) -> float:
+    """What one non-streamed call to the fake server takes, before jitter."""
+    return args.latency + (args.completion_tokens / args.tokens_per_second if args.tokens_per_second > 0 else 0.0)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    llm = start_fake_llm(args, workdir)
+    app = start_app(args, app_environment(args, workdir), os.path.join(workdir, "app.log"))
+
+    recorder = Recorder()
+    memory = []
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await wait_until_ready(session, f"{llm_url}/stats", llm, 30)
+            await wait_until_ready(session, f"{base_url}/health", app, 60)
+            async with session.get(f"{base_url}/metrics") as response:
+                calls_before = llm_calls_by_task(await response.text())
+
+            async def sample_memory():
+                while True:
+                    memory.append(rss_mb(app.pid))
+                    await asyncio.sleep(0.5)
+
+            sampler = asyncio.create_task(sample_memory())
+            start = time.monotonic()
+            deadline = start + args.duration
+            mix = parse_mix(args.mix)
+            await asyncio.gather(*[
+                virtual_user(i, base_url, session, recorder, mix, deadline, args.seed, args.incremental)
+                for i in range(args.users)
+            ])
+            duration = time.monotonic() - start
+            sampler.cancel()
+            memory.append(rss_mb(app.pid))
+
+            async with session.get(f"{base_url}/metrics") as response:
+                calls_after = llm_calls_by_task(await response.text())
+            async with session.get(f"{llm_url}/stats") as response:
+                upstream = await response.json()
+    finally:
+        stop_processes(app, llm)
+
+    all_latencies = [value for values in recorder.latencies.values() for value in values]
+    all_statuses = defaultdict(int)
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] += count
+    samples = [value for value in memory if value is not None]
+
+    return {
+        **report_info(args),
+        "duration_s": round(duration, 3),
+        "total": summarize(all_latencies, all_statuses, duration),
+        "endpoints": {
+            endpoint: summarize(values, recorder.statuses[endpoint], duration)
+            for endpoint, values in sorted(recorder.latencies.items())
+        },
+        "upstream": {
+            **upstream,
+            # Only this process's calls with --workers 1; per-worker metrics otherwise
+            "calls_by_task": {task: count - calls_before.get(task, 0) for task, count in sorted(calls_after.items())},
+        },
+        "memory_mb": {
+            "start": round(samples[0], 1),
+            "end": round(samples[-1], 1),
+            "peak": round(max(samples), 1),
+            "growth": round(samples[-1] - samples[0], 1),
+        } if samples else None,
+        "logs": workdir,
+    }
+
+
+############ Startup #################
+
+def import_profile(env: Dict[str, str], top: int = 10) -> dict:
+    """`import main` in a fresh interpreter: total seconds, and the slowest modules it imports directly."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=HERE, env=env,
+                               capture_output=True, text=True, check=True)
+    # Lines come out as each import finishes, so a module's own imports are listed (one level deeper)
+    # before it. Stray lines from the parsing pool's helper process are too small to matter.
+    direct, total, started = [], None, False
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)$", line)
+        if match is None:
+            continue
+        cumulative, depth, name = int(match.group(1)) / 1e6, (len(match.group(2)) - 1) // 2, match.group(3)
+        if depth == 0 and name == "site" and not started:
+            started = True  # interpreter start-up is done, main's imports come next
+        elif depth == 0 and name == "main":
+            total = cumulative
+            break
+        elif depth == 1 and started:
+            direct.append((name, cumulative))
+    direct.sort(key=lambda item: item[1], reverse=True)
+    return {"import_s": total, "slowest": {name: round(seconds, 3) for name, seconds in direct[:top]}}
+
+
+async def startup_run(args: argparse.Namespace, workdir: str, session: aiohttp.ClientSession, index: int) -> dict:
+    """Start the app once: seconds until /health answers, and until a first chat reply (cold chains) is back."""
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    env = app_environment(args, os.path.join(workdir, f"run{index}"))
+    os.makedirs(os.path.join(workdir, f"run{index}"))
+    start = time.perf_counter()
+    app = start_app(args, env, os.path.join(workdir, f"app{index}.log"))
+    try:
+        await wait_until_ready(session, f"{base_url}/health", app, 60, poll=0.01)
+        health = time.perf_counter() - start
+        pdf = sample_resume_pdf(random.Random(args.seed))
+        fields = {"user_id": "startup"}
+        async with session.post(f"{base_url}/chatbot/load", data=form(fields, pdf)) as response:
+            await response.read()
+        reply_start = time.perf_counter()
+        message = form({**fields, "message": CHAT_MESSAGES[0]})
+        async with session.post(f"{base_url}/chatbot/respond", data=message) as response:
+            await response.read()
+            status = response.status
+        end = time.perf_counter()
+        return {
+            "health_s": round(health, 3),
+            "first_reply_s": round(end - start, 3),
+            "first_reply_latency_s": round(end - reply_start, 3),
+            "first_reply_status": status,
+            "rss_mb": rss_mb(app.pid),
+        }
+    finally:
+        stop_processes(app)
+
+
+async def run_startup(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    llm = start_fake_llm(args, workdir)
+    runs = []
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.request_timeout)) as session:
+            await wait_until_ready(session, f"http://127.0.0.1:{args.llm_port}/stats", llm, 30)
+            for index in range(args.startup):
+                runs.append(await startup_run(args, workdir, session, index))
+    finally:
+        stop_processes(llm)
+
+    env = app_environment(args, workdir)
+    profiles = [import_profile(env) for _ in range(args.startup)]
+    return {
+        **report_info(args),
+        "median": {
+            "import_s": round(statistics.median(profile["import_s"] for profile in profiles), 3),
+            **{key: round(statistics.median(run[key] for run in runs), 3)
+               for key in ("health_s", "first_reply_s", "first_reply_latency_s")},
+        },
+        "import_profile": profiles[-1]["slowest"],
+        "runs": runs,
+        "logs": workdir,
+    }
+
+
+############ Analysis fan-out #################
+
+async def post_analysis(session: aiohttp.ClientSession, base_url: str, user_id: str, pdf: bytes) -> Tuple[float, int]:
+    """One full /analyze (no cache, no incremental reuse): seconds and status."""
+    fields = {"user_id": user_id, "incremental": "false", "no_cache": "true"}
+    start = time.perf_counter()
+    async with session.post(f"{base_url}/analyze", data=form(fields, pdf)) as response:
+        await response.read()
+        return time.perf_counter() - start, response.status
+
+
+async def run_fanout(args: argparse.Namespace) -> dict:
+    """/analyze wall-clock with the eight section chains run one at a time vs. side by side."""
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    llm = start_fake_llm(args, workdir)
+    pdfs = [sample_resume_pdf(random.Random(args.seed + i)) for i in range(args.fanout)]
+    modes = {}
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.request_timeout)) as session:
+            await wait_until_ready(session, f"http://127.0.0.1:{args.llm_port}/stats", llm, 30)
+            for label, concurrency in (("sequential", 1), ("concurrent", 8)):
+                env = app_environment(args, os.path.join(workdir, label))
+                # Every section goes to the LLM through its own chain
+                env.update(ANALYSIS_MAX_CONCURRENCY=str(concurrency), ANALYSIS_MODE="multi", LOCAL_CHECKS="")
+                async with running_app(args, session, env, os.path.join(workdir, label)):
+                    runs = [await post_analysis(session, base_url, f"fanout-{i}", pdf) for i, pdf in enumerate(pdfs)]
+                seconds = [run[0] for run in runs]
+                modes[label] = {
+                    "analysis_max_concurrency": concurrency,
+                    "median_s": round(statistics.median(seconds), 3),
+                    "min_s": round(min(seconds), 3),
+                    "max_s": round(max(seconds), 3),
+                    "status": dict(Counter(str(run[1]) for run in runs)),
+                }
+    finally:
+        stop_processes(llm)
+
+    call_s = fake_call_seconds(args)
+    return {
+        **report_info(args),
+        # Eight chains back to back should take their sum; side by side, about the slowest one
+        "fake_call_s": round(call_s, 3),
+        "expected_s": {"sequential": round(8 * call_s, 3), "concurrent": round(call_s + args.jitter, 3)},
+        "modes": modes,
+        "speedup": round(modes["sequential"]["median_s"] / modes["concurrent"]["median_s"], 2),
+        "logs": workdir,
+    }
+
+
+############ Analysis modes #################
+
+async def run_compare_modes(args: argparse.Namespace) -> dict:
+    """Tokens, upstream calls and latency of the multi-chain vs. single-pass analysis on a fixed corpus."""
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    llm = start_fake_llm(args, workdir)
+    corpus = [sample_resume_pdf(random.Random(args.seed + i)) for i in range(args.compare_modes)]
+    modes = {}
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.request_timeout)) as session:
+            await wait_until_ready(session, f"{llm_url}/stats", llm, 30)
+            for mode in ("multi", "single"):
+                env = app_environment(args, os.path.join(workdir, mode))
+                # Only the LLM answers, so both modes produce every section the same way
+                env.update(ANALYSIS_MODE=mode, LOCAL_CHECKS="")
+                async with running_app(args, session, env, os.path.join(workdir, mode)):
+                    async with session.post(f"{llm_url}/stats/reset") as response:
+                        await response.read()
+                    runs = [await post_analysis(session, base_url, f"corpus-{i}", pdf) for i, pdf in enumerate(corpus)]
+                    async with session.get(f"{llm_url}/stats") as response:
+                        upstream = await response.json()
+                seconds = [run[0] for run in runs]
+                modes[mode] = {
+                    "status": dict(Counter(str(run[1]) for run in runs)),
+                    "median_s": round(statistics.median(seconds), 3),
+                    "calls_per_resume": round(upstream["calls"] / len(corpus), 2),
+                    "prompt_tokens_per_resume": round(upstream["prompt_tokens"] / len(corpus)),
+                    "completion_tokens_per_resume": round(upstream["completion_tokens"] / len(corpus)),
+                }
+    finally:
+        stop_processes(llm)
+
+    multi, single = modes["multi"], modes["single"]
+    return {
+        **report_info(args),
+        "resumes": len(corpus),
+        "modes": modes,
+        "single_vs_multi": {
+            key: round(single[key] / multi[key], 3)
+            for key in ("median_s", "calls_per_resume", "prompt_tokens_per_resume", "completion_tokens_per_resume")
+            if multi[key]
+        },
+        "logs": workdir,
+    }
+
+
+############ Health under load #################
+
+def latency_stats(values: List[float]) -> dict:
+    values = sorted(values)
+    return {
+        "samples": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+async def run_health_load(args: argparse.Namespace) -> dict:
+    """/health latency while --health-load analyses run at once, and how fast those analyses finish."""
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    llm = start_fake_llm(args, workdir)
+    pdfs = [sample_resume_pdf(random.Random(args.seed + i)) for i in range(args.health_load)]
+    env = app_environment(args, workdir)
+    # Admit every analysis at once instead of queueing them behind the in-flight budget, and finish
+    # building the chains before measuring
+    env.update(ADMISSION_MAX_INFLIGHT="0", LLM_WARMUP="startup")
+
+    async def health_seconds(session: aiohttp.ClientSession) -> float:
+        start = time.perf_counter()
+        async with session.get(f"{base_url}/health") as response:
+            await response.read()
+        return time.perf_counter() - start
+
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+            await wait_until_ready(session, f"http://127.0.0.1:{args.llm_port}/stats", llm, 30)
+            async with running_app(args, session, env, workdir):
+                idle = [await health_seconds(session) for _ in range(20)]
+                under_load = []
+                loaded = True
+
+                async def poll_health():
+                    while loaded:
+                        under_load.append(await health_seconds(session))
+                        await asyncio.sleep(0.05)
+
+                poller = asyncio.create_task(poll_health())
+                start = time.monotonic()
+                runs = await asyncio.gather(*[
+                    post_analysis(session, base_url, f"load-{i}", pdf) for i, pdf in enumerate(pdfs)
+                ])
+                duration = time.monotonic() - start
+                loaded = False
+                await poller
+    finally:
+        stop_processes(llm)
+
+    return {
+        **report_info(args),
+        "analyses": summarize([run[0] for run in runs], Counter(str(run[1]) for run in runs), duration),
+        "duration_s": round(duration, 3),
+        "health": {"idle": latency_stats(idle), "under_load": latency_stats(under_load)},
+        "logs": workdir,
+    }
+
+
+############ Per-message parse cost #################
+
+def time_calls(call, n: int) -> dict:
+    """Mean wall-clock and CPU milliseconds of `call()` over n runs."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(n):
+        call()
+    return {
+        "wall_ms": round((time.perf_counter() - wall) / n * 1000, 3),
+        "cpu_ms": round((time.process_time() - cpu) / n * 1000, 3),
+    }
+
+
+def run_parse_cost(args: argparse.Namespace) -> dict:
+    """What each chat message pays to get the resume text, before and after parsing once per upload."""
+    from resume_store import parse_resume
+    from session_store import MemorySessionStore, Session
+
+    pdf = sample_resume_pdf(random.Random(args.seed))
+    messages = args.parse_cost
+
+    def reparse_flat():
+        # What every /chatbot/respond, /jobmatch and /revision used to do with the stored PDF bytes
+        doc = fitz.open(stream=pdf, filetype="pdf")
+        "".join(page.get_text() for page in doc)
+        doc.close()
+
+    store = MemorySessionStore(checkpoints=None)
+    parse = time_calls(lambda: store.put(Session(user_id="bench", resume=parse_resume(pdf))), 1)
+    before = time_calls(reparse_flat, messages)
+    after = time_calls(lambda: store.get("bench").resume.text, messages)
+    return {
+        **report_info(args),
+        "pdf_bytes": len(pdf),
+        "per_message": {"reparse_pdf": before, "session_lookup": after},
+        "per_session": {
+            "messages": messages,
+            "before_ms": round(before["wall_ms"] * messages, 3),
+            # One layout-aware parse at upload, then lookups
+            "after_ms": round(parse["wall_ms"] + after["wall_ms"] * messages, 3),
+        },
+    }
+
+
+############ Parsing throughput #################
+
+def run_parse_throughput(args: argparse.Namespace) -> dict:
+    """Layout-aware parsing (what uploads use) vs. flat get_text() over a corpus of generated PDFs."""
+    from resume_parser import CONTACT_SECTION, extract_pdf
+    from resume_store import MAX_PAGES, estimate_tokens
+
+    corpus = [sample_resume_pdf(random.Random(args.seed + i)) for i in range(args.parse_throughput)]
+
+    def flat(pdf: bytes) -> str:
+        doc = fitz.open(stream=pdf, filetype="pdf")
+        text = "".join(page.get_text() for page in doc)
+        doc.close()
+        return text
+
+    def timed(parse) -> Tuple[dict, list]:
+        seconds, results = [], []
+        start = time.perf_counter()
+        for pdf in corpus:
+            began = time.perf_counter()
+            results.append(parse(pdf))
+            seconds.append(time.perf_counter() - began)
+        total = time.perf_counter() - start
+        return {"pdfs_per_second": round(len(corpus) / total, 1), **latency_stats(seconds)}, results
+
+    baseline, _ = timed(flat)
+    layout, extracted = timed(lambda pdf: extract_pdf(pdf, MAX_PAGES))
+    full_tokens = sum(estimate_tokens(result["text"]) for result in extracted)
+    contact_tokens = sum(estimate_tokens(result["sections"].get(CONTACT_SECTION) or result["text"])
+                         for result in extracted)
+    return {
+        **report_info(args),
+        "pdfs": len(corpus),
+        "pages": sum(result["page_count"] for result in extracted),
+        "flat_get_text": baseline,
+        "layout": layout,
+        "with_sections": sum(1 for result in extracted if len(result["sections"]) > 1),
+        # What the personal-info prompt gets: the contact block instead of the whole resume
+        "info_prompt_tokens": {"full_text": full_tokens, "contact_section": contact_tokens},
+    }
+
+
+############ Job pre-ranking #################
+
+def sample_job_description(rng: random.Random) -> str:
+    skills = rng.sample(SKILLS, 4)
+    return (f"{rng.choice(ROLES)} at {rng.choice(COMPANIES)}. {rng.choice(JOB_DESCRIPTIONS)} "
+            f"You will work with {', '.join(skills[:-1])} and {skills[-1]}. "
+            f"{rng.choice(BULLETS).format(n=rng.randint(2, 40), p=rng.randint(5, 60))}")
+
+
+def run_prerank(args: argparse.Namespace) -> dict:
+    """Time the local pre-ranker over N postings: first sight (vectorize + index) vs. seen before."""
+    from job_rank import JobIndex
+    from resume_store import parse_resume
+
+    rng = random.Random(args.seed)
+    resume_text = parse_resume(sample_resume_pdf(rng)).text
+    postings = [sample_job_description(rng) + f" Ref {i}." for i in range(args.prerank)]
+    index = JobIndex()
+
+    def timed(call) -> float:
+        start = time.perf_counter()
+        call()
+        return round((time.perf_counter() - start) * 1000, 3)
+
+    first = timed(lambda: index.rank_texts(resume_text, postings))
+    repeats = [timed(lambda: index.rank_texts(resume_text, postings)) for _ in range(5)]
+    return {
+        **report_info(args),
+        "postings": len(postings),
+        "first_ms": first,
+        "repeat_ms": statistics.median(repeats),
+        "repeat_per_posting_us": round(statistics.median(repeats) / len(postings) * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test of the app against a fake LLM server.")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"action weights (default {DEFAULT_MIX})")
+    parser.add_argument("--incremental", action="store_true", help="let re-analyses reuse unchanged sections")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--tokens-per-second", type=float, default=100)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="extra app setting")
+    parser.add_argument("--app-port", type=int, default=8801)
+    parser.add_argument("--llm-port", type=int, default=8802)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--startup", type=int, default=0, metavar="RUNS",
+                        help="instead of a load test, measure import and start-up time over this many cold starts")
+    parser.add_argument("--fanout", type=int, default=0, metavar="RESUMES",
+                        help="instead of a load test, time this many analyses with sequential vs. concurrent chains")
+    parser.add_argument("--compare-modes", type=int, default=0, metavar="RESUMES",
+                        help="instead of a load test, compare ANALYSIS_MODE=multi and single over this many resumes")
+    parser.add_argument("--health-load", type=int, default=0, metavar="ANALYSES",
+                        help="instead of a load test, poll /health while this many analyses run at once")
+    parser.add_argument("--parse-cost", type=int, default=0, metavar="MESSAGES",
+                        help="instead of a load test, compare re-parsing the PDF per chat message with a session lookup")
+    parser.add_argument("--parse-throughput", type=int, default=0, metavar="PDFS",
+                        help="instead of a load test, time parsing this many generated resume PDFs")
+    parser.add_argument("--prerank", type=int, default=0, metavar="POSTINGS",
+                        help="instead of a load test, time the local job pre-ranker over this many postings")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.startup:
+        report = asyncio.run(run_startup(args))
+    elif args.fanout:
+        report = asyncio.run(run_fanout(args))
+    elif args.compare_modes:
+        report = asyncio.run(run_compare_modes(args))
+    elif args.health_load:
+        report = asyncio.run(run_health_load(args))
+    elif args.parse_cost:
+        report = run_parse_cost(args)
+    elif args.parse_throughput:
+        report = run_parse_throughput(args)
+    elif args.prerank:
+        report = run_prerank(args)
+    else:
+        report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# chat_model.py
+# The LangChain chat model and callback classes. Only llm_client imports this, the first time a
+# model is needed, so the app can start serving before LangChain is loaded.
+
+import asyncio
+import importlib
+import time
+import warnings
+from typing import Any, AsyncIterator, Dict, Optional
+from uuid import UUID
+
+from langchain_community.chat_models import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGenerationChunk, ChatResult, LLMResult
+
+from llm_client import LLM_MAX_CONCURRENCY, task_setting
+from metrics import LLM_ERRORS, LLM_SECONDS, LLM_TOKENS
+
+# The langchain package turns its deprecation warnings back on when first imported (by the chain
+# factories, later), so it is loaded here, before the app mutes them
+importlib.import_module("langchain")
+warnings.filterwarnings("ignore")
+
+
+############ Concurrency limits #################
+
+_global_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_task_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def _slots_for(task: str) -> asyncio.Semaphore:
+    if task not in _task_slots:
+        _task_slots[task] = asyncio.Semaphore(int(task_setting(task, "LLM_MAX_CONCURRENCY", LLM_MAX_CONCURRENCY)))
+    return _task_slots[task]
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose async calls wait for a global and a per-task concurrency slot."""
+
+    task: str = "default"
+
+    async def _agenerate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        async with _slots_for(self.task), _global_slots:
+            return await super()._agenerate(*args, **kwargs)
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async with _slots_for(self.task), _global_slots:
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+
+############ Usage metrics #################
+
+class LLMUsageHandler(BaseCallbackHandler):
+    """Records latency, errors and prompt/completion token counts of every call a model makes."""
+
+    run_inline = True
+
+    def __init__(self, task: str):
+        self.task = task
+        self._starts: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        start: Optional[float] = self._starts.pop(run_id, None)
+        if start is not None:
+            LLM_SECONDS.observe(time.perf_counter() - start, task=self.task)
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens"):
+            LLM_TOKENS.inc(usage["prompt_tokens"], task=self.task, kind="prompt")
+        if usage.get("completion_tokens"):
+            LLM_TOKENS.inc(usage["completion_tokens"], task=self.task, kind="completion")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts.pop(run_id, None)
+        LLM_ERRORS.inc(task=self.task)
@@ -1,24 +1,26 @@
 # chatbot.py
 
+import logging
 import os
-import fitz
-from typing import Dict
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import MessagesPlaceholder
-from langchain.prompts.chat import (
-    ChatPromptTemplate,
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate
-)
-from analysis import extract_text_from_pdf
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+from llm_client import Lazy, LazyChain, get_llm
+from metrics import span
+from resume_store import estimate_tokens
+from session_store import Session
 
+if TYPE_CHECKING:
+    from langchain.chains import ConversationChain
 
-llm = ChatOpenAI(temperature=0.7, model="gpt-4o-mini")
+logger = logging.getLogger(__name__)
 
-# Volatile in-memory chat history
-USER_CHATBOTS: Dict[str, ConversationChain] = {}
+# How much conversation is resent each turn:
+#   "buffer"  - everything (prompt grows with every turn)
+#   "window"  - only the most recent turns, older ones are dropped
+#   "summary" - the most recent turns, with older ones folded into a rolling summary
+CHAT_MEMORY_MODE = os.getenv("CHAT_MEMORY_MODE", "summary")
+# Compaction kicks in past this many turns or this many history tokens, and keeps half the turns verbatim
+CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "8"))
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "2000"))
 
 
 # Prompt template
@@ -35,26 +37,176 @@ Speak directly to the user using “you.” Offer practical, constructive, and s
 Whenever answering questions, try to be as hyperspecific and as personalized to the resume and candidate as possible.
 
 If the user asks something outside the scope of the resume (e.g., interview tips), you can still answer, but stay helpful and relevant.
-"""
+{conversation_summary}"""
 
 human_prompt = "{input}"
 
-chat_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(system_prompt),
-    MessagesPlaceholder(variable_name="chat_history"),
-    HumanMessagePromptTemplate.from_template(human_prompt),
-])
 
-def get_or_create_chatbot(user_id: str, resume_text: str) -> ConversationChain:
-    if user_id in USER_CHATBOTS:
-        return USER_CHATBOTS[user_id]
+def _build_chat_prompt():
+    from langchain.prompts import MessagesPlaceholder
+    from langchain.prompts.chat import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+
+    return ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(system_prompt),
+        MessagesPlaceholder(variable_name="chat_history"),
+        HumanMessagePromptTemplate.from_template(human_prompt),
+    ])
+
+
+chat_prompt = Lazy("chat.prompt", _build_chat_prompt)
+
+summarize_prompt = """
+Progressively summarize a conversation between a job applicant and their resume assistant. \
+Add the new lines to the current summary and return a new summary of at most 150 words. \
+Keep the applicant's goals, decisions, and any resume changes you already suggested. \
+Only output the summary.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:
+"""
+
+summarize_chain = LazyChain("chat_summary", summarize_prompt)
+
+
+def _summary_block(summary: str) -> str:
+    if not summary:
+        return ""
+    return f"\nSummary of the earlier conversation with this user:\n{summary}\n"
+
+
+def get_or_create_chatbot(session: Session) -> "ConversationChain":
+    """Build a chat chain for the session, seeded with its stored history and summary."""
+    from langchain.chains import ConversationChain
+    from langchain.memory import ConversationBufferMemory
+    from langchain_core.messages import messages_from_dict
 
     memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    memory.chat_memory.messages = messages_from_dict(session.history)
     chain = ConversationChain(
-        llm=llm,
-        prompt=chat_prompt.partial(resume=resume_text),
+        llm=get_llm("chat"),
+        prompt=chat_prompt.get().partial(resume=session.resume.text, conversation_summary=_summary_block(session.summary)),
         memory=memory,
         verbose=False,
     )
-    USER_CHATBOTS[user_id] = chain
     return chain
+
+
+def prompt_tokens(chain: "ConversationChain", message: str) -> int:
+    """Estimated input tokens for the next turn: system prompt, summary, history and message."""
+    from langchain_core.messages import get_buffer_string
+
+    inputs = chain.memory.load_memory_variables({})
+    messages = chain.prompt.format_messages(input=message, **inputs)
+    return estimate_tokens(get_buffer_string(messages))
+
+
+def save_chat_history(session: Session, chain: "ConversationChain", seeded: int) -> None:
+    """Append the turn the chain just recorded to the session, so the store can size and keep it.
+    Only messages after the `seeded` ones are copied: the history may have been compacted meanwhile."""
+    from langchain_core.messages import messages_to_dict
+
+    session.history = session.history + messages_to_dict(chain.memory.chat_memory.messages[seeded:])
+
+
+def _kept_messages() -> int:
+    # Compaction keeps the most recent half of CHAT_MEMORY_TURNS turns verbatim
+    return max(1, CHAT_MEMORY_TURNS // 2) * 2
+
+
+def needs_compaction(session: Session) -> bool:
+    """Whether the history has passed CHAT_MEMORY_TURNS turns or CHAT_MEMORY_TOKEN_BUDGET tokens."""
+    if CHAT_MEMORY_MODE == "buffer" or len(session.history) <= _kept_messages():
+        return False
+    if len(session.history) // 2 > CHAT_MEMORY_TURNS:
+        return True
+    from langchain_core.messages import get_buffer_string, messages_from_dict
+
+    return estimate_tokens(get_buffer_string(messages_from_dict(session.history))) > CHAT_MEMORY_TOKEN_BUDGET
+
+
+async def plan_compaction(session: Session) -> Optional[Tuple[List[dict], str]]:
+    """The older messages compaction would drop and the summary to keep in their place (unchanged
+    in "window" mode, extended by the summarizer in "summary" mode).
+
+    None if the history is within budget, or if the summarizer failed: the history then stays
+    uncompacted and compaction is tried again after the next turn. Compacting in batches means
+    the summarizer runs every few turns, not every turn.
+    """
+    if not needs_compaction(session):
+        return None
+    from langchain_core.messages import get_buffer_string, messages_from_dict
+
+    older = session.history[:-_kept_messages()]
+    summary = session.summary
+    if CHAT_MEMORY_MODE == "summary":
+        try:
+            with span("chain:chat_summary"):
+                outputs = await summarize_chain.ainvoke(
+                    {"summary": summary, "new_lines": get_buffer_string(messages_from_dict(older))}
+                )
+        except Exception:
+            logger.exception("Chat history compaction failed for user %s", session.user_id)
+            return None
+        summary = outputs[summarize_chain.output_key].strip()
+    return older, summary
+
+
+def apply_compaction(session: Session, older: List[dict], summary: str) -> bool:
+    """Drop `older` from the front of the history and keep `summary`. Turns recorded since the
+    plan was made are kept; if the history no longer starts with `older` (compacted or replaced
+    meanwhile) nothing changes and False is returned."""
+    if session.history[:len(older)] != older:
+        return False
+    session.history = session.history[len(older):]
+    session.summary = summary
+    return True
+
+
+async def compact_history(session: Session) -> bool:
+    """Keep the resent history bounded, per CHAT_MEMORY_MODE.
+
+    Once the history passes CHAT_MEMORY_TURNS turns or CHAT_MEMORY_TOKEN_BUDGET tokens, all but the
+    most recent half of the turns are dropped ("window") or folded into the rolling summary
+    ("summary"). Returns whether the history was compacted.
+    """
+    compaction = await plan_compaction(session)
+    return compaction is not None and apply_compaction(session, *compaction)
+
+
+async def chat_reply(session: Session, message: str) -> dict:
+    """Answer one message and record the turn in the session. Compaction is left to the caller
+    (see compact_history), so the reply doesn't wait on the summarizer."""
+    chain = get_or_create_chatbot(session)
+    seeded = len(session.history)
+    tokens = prompt_tokens(chain, message)
+    with span("chain:chat"):
+        outputs = await chain.ainvoke({"input": message})
+    save_chat_history(session, chain, seeded)
+    return {"response": outputs[chain.output_key], "prompt_tokens": tokens}
+
+
+async def stream_chat_reply(session: Session, message: str, usage: Optional[dict] = None) -> AsyncIterator[str]:
+    """Yield the reply token by token, then record the full turn in the session's history.
+    The prompt's estimated tokens are put in `usage["prompt_tokens"]` before the first token."""
+    chain = get_or_create_chatbot(session)
+    seeded = len(session.history)
+    inputs = chain.memory.load_memory_variables({})
+    messages = chain.prompt.format_messages(input=message, **inputs)
+    if usage is not None:
+        from langchain_core.messages import get_buffer_string
+
+        usage["prompt_tokens"] = estimate_tokens(get_buffer_string(messages))
+
+    reply = []
+    with span("chain:chat"):
+        async for chunk in chain.llm.astream(messages):
+            reply.append(chunk.content)
+            yield chunk.content
+
+    chain.memory.save_context({"input": message}, {"response": "".join(reply)})
+    save_chat_history(session, chain, seeded)
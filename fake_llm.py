@@ -0,0 +1,154 @@
+# fake_llm.py
+"""A stand-in for the OpenAI chat completions API, for benchmarks and offline development.
+
+    python fake_llm.py --port 8765 --latency 0.5 --tokens-per-second 80
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake uvicorn main:app
+
+Replies are filler text of --completion-tokens words, or JSON where the app expects JSON (job
+match, structured single-pass analysis). A reply takes --latency seconds to start, then streams
+at --tokens-per-second. GET /stats returns call and token counts; POST /stats/reset clears them.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+from job_match import FIT_CATEGORY_ORDER
+
+
+WORDS = ("experience project team python data skills results customer growth design lead built improved "
+         "managed analysis strategy platform cloud communication impact role resume candidate strong").split()
+
+
+class FakeLLM:
+    def __init__(self, latency: float, jitter: float, tokens_per_second: float, completion_tokens: int,
+                 error_rate: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens_total = 0
+
+    def _filler(self, n_tokens: int) -> str:
+        return " ".join(random.choice(WORDS) for _ in range(n_tokens))
+
+    def _content(self, body: dict) -> str:
+        prompt = json.dumps(body.get("messages", []))
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            keys = response_format["json_schema"]["schema"].get("required", [])
+            return json.dumps({key: self._filler(self.completion_tokens // max(1, len(keys))) for key in keys})
+        if "fit_category" in prompt:
+            return json.dumps({
+                "fit_category": random.choice(FIT_CATEGORY_ORDER),
+                "matched_skills": random.sample(WORDS, 4),
+                "missing_skills": random.sample(WORDS, 2),
+                "recommendation": self._filler(40),
+            })
+        return self._filler(self.completion_tokens)
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+            if random.random() < self.error_rate:
+                self.errors += 1
+                return web.json_response({"error": {"message": "fake overload", "type": "server_error"}}, status=503)
+
+            content = self._content(body)
+            prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+            words = content.split(" ")
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens_total += len(words)
+            delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+            if body.get("stream"):
+                return await self._stream(request, body, words, delay)
+            await asyncio.sleep(len(words) * delay)
+            return web.json_response({
+                "id": f"chatcmpl-{self.calls}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words)},
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, request: web.Request, body: dict, words: list, delay: float) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i, word in enumerate(words):
+            chunk = {
+                "id": f"chatcmpl-{self.calls}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(delay)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "calls": self.calls,
+            "errors": self.errors,
+            "max_in_flight": self.max_in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens_total,
+        })
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"status": "ok"})
+
+
+def build_app(fake: FakeLLM) -> web.Application:
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", fake.completions)
+    app.router.add_post("/chat/completions", fake.completions)
+    app.router.add_get("/stats", fake.stats)
+    app.router.add_post("/stats/reset", fake.reset_stats)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds of random latency")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="0 to reply instantly")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="words per filler reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with a 503")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fake = FakeLLM(args.latency, args.jitter, args.tokens_per_second, args.completion_tokens, args.error_rate)
+    web.run_app(build_app(fake), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,17 @@
 #job_match.py
 
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+import asyncio
 import json
+import os
 import re
+from typing import Awaitable, Callable, List
 
-llm = ChatOpenAI(temperature=0.3, model="gpt-4o-mini")
+from job_rank import JOB_INDEX
+from llm_client import LazyChain
+from metrics import span
+from result_cache import template_version
 
-job_match_prompt = PromptTemplate(
-    input_variables=["resume", "job_description"],
-    template="""
+job_match_prompt = """
 You are an expert career advisor AI. Evaluate how well the resume below matches the job description provided.
 Base your evaluation ONLY on the text content, not formatting.
 Try to be as hyperspecific and as personalized to the resume and candidate as possible.
@@ -48,17 +49,92 @@ Provide a JSON response with the following fields:
 
 Respond only in raw JSON format.
 """
-)
 
-job_match_chain = LLMChain(llm=llm, prompt=job_match_prompt)
+job_match_chain = LazyChain("job_match", job_match_prompt)
 
-def run_job_match(resume_text: str, job_description: str) -> dict:
-    raw_output = job_match_chain.run(resume=resume_text, job_description=job_description)
+# Changes whenever the prompt is edited; part of the result cache key
+PROMPT_VERSION = template_version(job_match_prompt)
+
+# Best fit first, used to rank batch results
+FIT_CATEGORY_ORDER = ["Ideal Match", "Strong Match", "Weak Match", "Underqualified", "Off-Target"]
+
+# Job descriptions per batch request, and how many of them are evaluated at once
+JOB_MATCH_BATCH_MAX = int(os.getenv("JOB_MATCH_BATCH_MAX", "50"))
+JOB_MATCH_BATCH_CONCURRENCY = int(os.getenv("JOB_MATCH_BATCH_CONCURRENCY", "8"))
+
+# Job descriptions per local pre-rank request (no LLM calls, so far more than a batch)
+JOB_RANK_BATCH_MAX = int(os.getenv("JOB_RANK_BATCH_MAX", "500"))
+
+async def run_job_match(resume_text: str, job_description: str) -> dict:
+    with span("chain:job_match"):
+        outputs = await job_match_chain.ainvoke({"resume": resume_text, "job_description": job_description})
+    raw_output = outputs[job_match_chain.output_key]
 
     # ✅ Strip Markdown code fences if present
     cleaned = re.sub(r"^```json|```$", "", raw_output.strip(), flags=re.MULTILINE).strip()
 
     try:
-        return json.loads(cleaned)
+        with span("job_match:parse_json"):
+            return json.loads(cleaned)
     except json.JSONDecodeError as e:
         raise ValueError(f"❌ Failed to parse JSON:\n\n{cleaned}\n\nError: {e}")
+
+
+def _fit_rank(result: dict) -> int:
+    category = result.get("fit_category")
+    return FIT_CATEGORY_ORDER.index(category) if category in FIT_CATEGORY_ORDER else len(FIT_CATEGORY_ORDER)
+
+
+def prerank_job_descriptions(resume_text: str, job_descriptions: List[str]) -> List[dict]:
+    """Instant, local relevance scores (no LLM), best first. Each item keeps its request "index"."""
+    ranked = []
+    for index, posting in enumerate(JOB_INDEX.rank_texts(resume_text, job_descriptions)):
+        ranked.append({
+            "index": index,
+            "prerank_score": round(posting.score, 4),
+            "similarity": round(posting.similarity, 4),
+            "skill_overlap": round(posting.skill_overlap, 4),
+        })
+    ranked.sort(key=lambda item: item["prerank_score"], reverse=True)
+    return ranked
+
+
+async def run_job_match_batch(
+    resume_text: str,
+    job_descriptions: List[str],
+    match: Callable[[str, str], Awaitable[dict]] = run_job_match,
+    top_k: int = 0,
+) -> dict:
+    """Match one resume against many job descriptions with bounded concurrency.
+
+    Returns the successful matches ranked by fit_category (best first, ties keep input order)
+    and, separately, the ones that failed. Each item keeps its position in the request as "index".
+    With top_k, postings are first pre-ranked locally and only the top_k best go to the LLM;
+    the rest are listed under "skipped" with their pre-rank score.
+    """
+    selected = list(range(len(job_descriptions)))
+    prerank_scores = {}
+    skipped = []
+    if 0 < top_k < len(job_descriptions):
+        with span("job_match:prerank"):
+            ranked = await asyncio.to_thread(prerank_job_descriptions, resume_text, job_descriptions)
+        prerank_scores = {item["index"]: item["prerank_score"] for item in ranked}
+        selected = sorted(item["index"] for item in ranked[:top_k])
+        skipped = [{"index": item["index"], "prerank_score": item["prerank_score"]} for item in ranked[top_k:]]
+
+    semaphore = asyncio.Semaphore(max(1, JOB_MATCH_BATCH_CONCURRENCY))
+
+    async def evaluate(index: int, job_description: str) -> dict:
+        async with semaphore:
+            try:
+                item = {"index": index, "result": await match(resume_text, job_description)}
+            except Exception as e:
+                item = {"index": index, "error": str(e)}
+        if index in prerank_scores:
+            item["prerank_score"] = prerank_scores[index]
+        return item
+
+    items = await asyncio.gather(*[evaluate(i, job_descriptions[i]) for i in selected])
+    results = sorted((item for item in items if "result" in item), key=lambda item: _fit_rank(item["result"]))
+    errors = [item for item in items if "error" in item]
+    return {"results": results, "errors": errors, "skipped": skipped}
@@ -0,0 +1,261 @@
+# job_queue.py
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import span
+from sqlite_store import SQLiteFile
+
+
+# Jobs live in a SQLite file, so queued and unfinished jobs survive a restart and every worker shares them
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.db")
+
+# Jobs processed at the same time per process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# A running job not finished within its lease (e.g. its worker died) is picked up again, up to
+# JOB_MAX_ATTEMPTS runs in total. Finished jobs are kept for JOB_RETENTION_SECONDS.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+# A failed run is retried after this many seconds, doubling with every attempt
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+
+# Idle workers check for jobs submitted by other processes this often
+JOB_POLL_INTERVAL = 0.5
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+@dataclass
+class Job:
+    """One unit of background work and, once finished, its result or error."""
+    job_id: str
+    kind: str
+    user_id: str
+    idempotency_key: str
+    status: str
+    payload: dict
+    result: Any
+    error: Optional[str]
+    attempts: int
+    created_at: float
+    updated_at: float
+
+    def public(self) -> dict:
+        """Status fields safe to return to clients (no payload or result)."""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+def idempotency_key(kind: str, user_id: str, content_hash: str) -> str:
+    """Same kind of job for the same user and resume -> same key."""
+    return hashlib.sha256(f"{kind}\0{user_id}\0{content_hash}".encode("utf-8")).hexdigest()
+
+
+# Queued and due (retries wait out their backoff), or running past the lease
+_CLAIMABLE = "(status = ? AND (lease_until IS NULL OR lease_until <= ?)) OR (status = ? AND lease_until < ?)"
+
+_COLUMNS = "job_id, kind, user_id, idempotency_key, status, payload, result, error, attempts, created_at, updated_at"
+
+
+def _job_from_row(row: tuple) -> Job:
+    job_id, kind, user_id, key, status, payload, result, error, attempts, created_at, updated_at = row
+    return Job(job_id, kind, user_id, key, status, json.loads(payload),
+               json.loads(result) if result is not None else None, error, attempts, created_at, updated_at)
+
+
+class JobQueue(SQLiteFile):
+    """Persistent job queue in a SQLite file. Claims take the file's write lock, so any number of
+    workers, in any number of processes, can pull from the same queue without running a job twice.
+
+    Calls block on SQLite; from async code, run them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, retention_seconds: float = JOB_RETENTION_SECONDS,
+                 retry_backoff_seconds: float = JOB_RETRY_BACKOFF_SECONDS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                idempotency_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                -- Running jobs: when the lease runs out. Queued jobs: when a retry may start.
+                lease_until REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS jobs_idempotency_key ON jobs (idempotency_key, created_at);
+        """)
+
+    def submit(self, kind: str, user_id: str, key: str, payload: dict, reuse_finished: bool = True) -> Tuple[Job, bool]:
+        """Queue a job, unless one with the same idempotency key is queued or running (or, with
+        reuse_finished, already done). Returns the job and whether it was newly created."""
+        now = time.time()
+        statuses = (QUEUED, RUNNING, DONE) if reuse_finished else (QUEUED, RUNNING)
+        with self._transaction():
+            self._purge(now)
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE idempotency_key = ? AND status IN ({','.join('?' * len(statuses))}) "
+                "ORDER BY created_at DESC LIMIT 1", (key, *statuses)
+            ).fetchone()
+            if row is not None:
+                return _job_from_row(row), False
+
+            job = Job(uuid.uuid4().hex, kind, user_id, key, QUEUED, payload, None, None, 0, now, now)
+            self._conn.execute(
+                f"INSERT INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, 0, ?, ?)",
+                (job.job_id, kind, user_id, key, QUEUED, json.dumps(payload), now, now),
+            )
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job_from_row(row) if row is not None else None
+
+    def claim(self) -> Optional[Job]:
+        """Take the oldest queued job (or one whose lease ran out) and mark it running."""
+        now = time.time()
+        # Idle workers poll, so check for work with a plain read before taking the write lock
+        with self._lock:
+            due = self._conn.execute(f"SELECT 1 FROM jobs WHERE {_CLAIMABLE} LIMIT 1", (QUEUED, now, RUNNING, now))
+            if due.fetchone() is None:
+                return None
+        with self._transaction():
+            # Jobs that already used up their attempts and then lost their worker again are given up on
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, lease_until = NULL "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "The job did not finish in time.", now, RUNNING, now, self.max_attempts),
+            )
+            row = self._conn.execute(
+                f"SELECT job_id FROM jobs WHERE {_CLAIMABLE} ORDER BY created_at LIMIT 1", (QUEUED, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, lease_until = ? WHERE job_id = ?",
+                (RUNNING, now, now + self.lease_seconds, row[0]),
+            )
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (row[0],)).fetchone()
+        return _job_from_row(row)
+
+    def finish(self, job_id: str, result: Any) -> None:
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ?, lease_until = NULL "
+                "WHERE job_id = ?", (DONE, json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Record a failed run. Until the job has used up its attempts, it is queued again to retry
+        after retry_backoff_seconds, doubled for every earlier attempt."""
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ?, updated_at = ?, "
+                "lease_until = CASE WHEN attempts < ? THEN ? + ? * (1 << MAX(attempts - 1, 0)) END WHERE job_id = ?",
+                (self.max_attempts, QUEUED, FAILED, error, now, self.max_attempts, now, self.retry_backoff_seconds, job_id),
+            )
+
+    def release(self, job_id: str) -> None:
+        """Put a job this process is giving up on (e.g. at shutdown) back in the queue without using an attempt."""
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), updated_at = ?, lease_until = NULL "
+                "WHERE job_id = ? AND status = ?", (QUEUED, time.time(), job_id, RUNNING),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+
+    def _purge(self, now: float) -> None:
+        # Must be inside self._transaction()
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, now - self.retention_seconds)
+        )
+
+
+JobHandler = Callable[[dict], Awaitable[Any]]
+
+
+class JobWorkers:
+    """A pool of asyncio tasks in this process running queued jobs through the handler for their kind."""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        """Start the workers. Call once the event loop is running."""
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake an idle worker right away instead of at its next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _work(self) -> None:
+        while True:
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                await asyncio.to_thread(self.queue.fail, job.job_id, f"Unknown job kind: {job.kind!r}")
+                continue
+            try:
+                with span(f"job:{job.kind}"):
+                    result = await handler(job.payload)
+            except asyncio.CancelledError:
+                # Shutting down: no awaiting here, the job just goes back in the queue
+                self.queue.release(job.job_id)
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.queue.fail, job.job_id, str(e))
+            else:
+                await asyncio.to_thread(self.queue.finish, job.job_id, result)
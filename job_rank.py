@@ -0,0 +1,223 @@
+# job_rank.py
+
+import hashlib
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Hashed feature space for word unigrams + bigrams; collisions are rare enough for a coarse score
+N_FEATURES = 2 ** 18
+
+# Postings kept in the index; it is cleared and starts over (as a new generation) once full
+JOB_INDEX_MAX_POSTINGS = int(os.getenv("JOB_INDEX_MAX_POSTINGS", "50000"))
+
+# Weight of TF-IDF cosine similarity vs. skill overlap in the combined score
+SIMILARITY_WEIGHT = 0.7
+
+# Common skills/tools looked for in job descriptions. Multi-word skills are matched as bigrams.
+SKILL_TERMS = frozenset("""
+python java javascript typescript c++ c# go rust ruby php swift kotlin scala r matlab sql nosql
+html css react angular vue node.js django flask fastapi spring .net rails next.js graphql rest
+aws azure gcp docker kubernetes terraform linux git jenkins ci/cd devops microservices
+postgresql mysql mongodb redis elasticsearch kafka spark hadoop airflow snowflake databricks
+pandas numpy tensorflow pytorch scikit-learn tableau excel powerbi looker
+machine learning deep learning data analysis data science statistics nlp llm
+agile scrum jira figma salesforce sap seo marketing sales accounting finance budgeting
+leadership communication management stakeholder negotiation mentoring
+""".split()) | frozenset({
+    "machine learning", "deep learning", "data analysis", "data science", "project management",
+    "product management", "computer vision", "natural language", "power bi", "google analytics",
+    "customer service", "unit testing", "system design", "cloud computing",
+})
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams followed by adjacent-word bigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _feature(term: str) -> int:
+    # Stable across processes, unlike hash(), and much cheaper than a cryptographic hash
+    return zlib.crc32(term.encode("utf-8")) % N_FEATURES
+
+
+def vectorize(text: str):
+    """Sparse sublinear term frequencies: (sorted feature indices, weights)."""
+    counts: Dict[int, int] = {}
+    for term in tokenize(text):
+        feature = _feature(term)
+        counts[feature] = counts.get(feature, 0) + 1
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    order = np.argsort(indices)
+    return indices[order], weights[order].astype(np.float32)
+
+
+def skill_terms(text: str) -> frozenset:
+    return frozenset(term for term in tokenize(text) if term in SKILL_TERMS)
+
+
+@dataclass
+class RankedPosting:
+    posting_id: int
+    score: float
+    similarity: float
+    skill_overlap: float
+
+
+class JobIndex:
+    """Incremental TF-IDF index of job descriptions.
+
+    Adding a posting only appends its sparse vector and bumps document frequencies; IDF weights and
+    norms are applied at query time, so nothing already indexed is recomputed. Postings are keyed
+    by a hash of their text, so one seen before is neither vectorized nor stored again.
+
+    Once full, the index is cleared and its generation bumped. Ids are only valid within the
+    generation they were handed out in; rank_texts() adds and scores postings as one step.
+    """
+
+    def __init__(self, max_postings: int = JOB_INDEX_MAX_POSTINGS):
+        self.max_postings = max_postings
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ids_by_hash: Dict[str, int] = {}
+        self._skills: List[frozenset] = []
+        self._doc_freq = np.zeros(N_FEATURES, dtype=np.float32)
+        # Concatenated sparse vectors of every posting (CSR-style), grown by doubling
+        self._indices = np.zeros(1024, dtype=np.int64)
+        self._weights = np.zeros(1024, dtype=np.float32)
+        self._offsets = [0]
+
+    def __len__(self) -> int:
+        return len(self._skills)
+
+    def add(self, text: str) -> int:
+        """Index one posting and return its id."""
+        return self.add_many([text])[0][0]
+
+    def add_many(self, texts: Sequence[str]) -> Tuple[List[int], int]:
+        """Index postings; returns their ids (in order) and the generation those ids belong to.
+
+        Only postings the index doesn't hold yet are vectorized, outside the lock. A batch that
+        doesn't fit clears the index first, so every id it returns is valid at the same time.
+        """
+        hashes = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        vectors: Dict[str, tuple] = {}
+        while True:
+            with self._lock:
+                missing = set(hashes) - self._ids_by_hash.keys()
+                full = len(self._skills) + len(missing) > self.max_postings
+                if full:
+                    missing = set(hashes)
+                if missing <= vectors.keys():
+                    if full:
+                        self._clear()
+                        self.generation += 1
+                    for text_hash in hashes:
+                        if text_hash not in self._ids_by_hash:
+                            self._append(text_hash, *vectors[text_hash])
+                    return [self._ids_by_hash[text_hash] for text_hash in hashes], self.generation
+            # Another request may clear the index meanwhile, so check again once these are ready
+            for text, text_hash in zip(texts, hashes):
+                if text_hash in missing and text_hash not in vectors:
+                    vectors[text_hash] = _posting_vector(text)
+
+    def _append(self, text_hash: str, indices: np.ndarray, weights: np.ndarray, skills: frozenset) -> None:
+        # Must hold self._lock
+        start = self._offsets[-1]
+        end = start + len(indices)
+        if end > len(self._indices):
+            capacity = max(end, 2 * len(self._indices))
+            self._indices = np.resize(self._indices, capacity)
+            self._weights = np.resize(self._weights, capacity)
+        self._indices[start:end] = indices
+        self._weights[start:end] = weights
+        self._offsets.append(end)
+        self._doc_freq[indices[weights > 0]] += 1
+
+        self._ids_by_hash[text_hash] = len(self._skills)
+        self._skills.append(skills)
+
+    def rank(self, resume_text: str, posting_ids: Optional[List[int]] = None) -> List[RankedPosting]:
+        """Score postings of the current generation against a resume, best first. Defaults to every
+        indexed posting."""
+        query = vectorize(resume_text)
+        with self._lock:
+            ids = np.arange(len(self._skills)) if posting_ids is None else np.asarray(posting_ids, dtype=np.int64)
+            similarity, skills = self._similarity(query, ids)
+        return _ranked(ids, similarity, skills, skill_terms(resume_text))
+
+    def rank_texts(self, resume_text: str, texts: Sequence[str]) -> List[RankedPosting]:
+        """Index `texts` and score them against a resume, one result per text in the same order.
+        If another request clears the index in between, the postings are added again."""
+        query = vectorize(resume_text)
+        while True:
+            posting_ids, generation = self.add_many(texts)
+            ids = np.asarray(sorted(set(posting_ids)), dtype=np.int64)
+            with self._lock:
+                if self.generation != generation:
+                    continue
+                similarity, skills = self._similarity(query, ids)
+            scores = {posting.posting_id: posting for posting in _ranked(ids, similarity, skills, skill_terms(resume_text))}
+            return [scores[posting_id] for posting_id in posting_ids]
+
+    def _similarity(self, query: tuple, ids: np.ndarray) -> Tuple[np.ndarray, List[frozenset]]:
+        # Must hold self._lock. Cosine similarity of the query to each posting, and their skills.
+        if len(ids) == 0:
+            return np.zeros(0, dtype=np.float32), []
+        query_indices, query_weights = query
+        n_postings = len(self._skills)
+
+        def idf(features: np.ndarray) -> np.ndarray:
+            return np.log((1.0 + n_postings) / (1.0 + self._doc_freq[features])) + 1.0
+
+        dense_query = np.zeros(N_FEATURES, dtype=np.float32)
+        dense_query[query_indices] = query_weights * idf(query_indices)
+        query_norm = float(np.linalg.norm(dense_query[query_indices])) or 1.0
+
+        # Gather just the selected postings' entries, then sum each one's segment
+        offsets = np.asarray(self._offsets)
+        starts, lengths = offsets[ids], offsets[ids + 1] - offsets[ids]
+        segments = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        gather = np.arange(lengths.sum()) - np.repeat(segments, lengths) + np.repeat(starts, lengths)
+        indices = self._indices[gather]
+        weights = self._weights[gather] * idf(indices)
+
+        dots = np.add.reduceat(dense_query[indices] * weights, segments)
+        norms = np.sqrt(np.add.reduceat(weights * weights, segments))
+        return dots / (np.maximum(norms, 1e-9) * query_norm), [self._skills[i] for i in ids]
+
+
+def _posting_vector(text: str) -> tuple:
+    """What the index stores for a posting: its sparse vector and skills."""
+    indices, weights = vectorize(text)
+    if len(indices) == 0:
+        # Every posting needs at least one entry; a zero weight makes it score zero
+        indices, weights = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.float32)
+    return indices, weights, skill_terms(text)
+
+
+def _ranked(ids: np.ndarray, similarity: np.ndarray, skills: List[frozenset], resume_skills: frozenset) -> List[RankedPosting]:
+    ranked = []
+    for posting_id, wanted, sim in zip(ids.tolist(), skills, similarity.tolist()):
+        overlap = len(wanted & resume_skills) / len(wanted) if wanted else 0.0
+        score = SIMILARITY_WEIGHT * sim + (1 - SIMILARITY_WEIGHT) * overlap
+        ranked.append(RankedPosting(posting_id, score, sim, overlap))
+    ranked.sort(key=lambda posting: posting.score, reverse=True)
+    return ranked
+
+
+# Shared across requests, so postings seen before are not re-vectorized
+JOB_INDEX = JobIndex()
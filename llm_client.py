@@ -0,0 +1,164 @@
+# llm_client.py
+
+import os
+import threading
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+import aiohttp
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import span
+
+if TYPE_CHECKING:
+    from langchain.chains import LLMChain
+    from chat_model import PooledChatOpenAI
+
+
+# Every task uses LLM_MODEL unless overridden, e.g. LLM_MODEL_REVISION=gpt-4o
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+TASK_TEMPERATURES = {
+    "analysis": 0.7,
+    "chat": 0.7,
+    "chat_summary": 0.3,
+    "job_match": 0.3,
+    "revision": 0.7,
+}
+
+# Retries use exponential backoff on rate limits (429), 5xx, timeouts and connection errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+
+# Keep-alive connections shared by every call, and calls in flight (overall and per task)
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "64"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+
+def task_setting(task: str, name: str, default: Any) -> str:
+    """LLM setting for one task: NAME_TASK, else NAME, else the default."""
+    return os.getenv(f"{name}_{task.upper()}", os.getenv(name, str(default)))
+
+
+############ Models and chains #################
+
+# When LangChain is imported and the chains and models below are built (see main.lifespan):
+#   "background" - in a thread once the server is up, so /health answers without waiting for it
+#   "startup"    - before the server starts accepting requests
+#   "off"        - each one on first use
+LLM_WARMUP = os.getenv("LLM_WARMUP", "background")
+
+_build_lock = threading.RLock()
+_llms: Dict[str, Any] = {}
+_lazy_objects: List["Lazy"] = []
+
+
+def get_llm(task: str) -> "PooledChatOpenAI":
+    """The shared chat model for a task, configured from LLM_* environment variables."""
+    if task not in _llms:
+        with _build_lock:
+            if task not in _llms:
+                from chat_model import LLMUsageHandler, PooledChatOpenAI
+
+                with span(f"build:llm:{task}"):
+                    _llms[task] = PooledChatOpenAI(
+                        task=task,
+                        model=task_setting(task, "LLM_MODEL", LLM_MODEL),
+                        temperature=float(task_setting(task, "LLM_TEMPERATURE", TASK_TEMPERATURES.get(task, 0.7))),
+                        max_retries=LLM_MAX_RETRIES,
+                        request_timeout=LLM_REQUEST_TIMEOUT,
+                        callbacks=[LLMUsageHandler(task)],
+                    )
+    return _llms[task]
+
+
+class Lazy:
+    """An object built by `factory` on first use (or by warm_up), then shared.
+
+    Importing LangChain and building prompts, chains and models is most of the app's start-up
+    time, so modules declare them this way instead of building them at import.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._value: Any = None
+        _lazy_objects.append(self)
+
+    def get(self) -> Any:
+        if self._value is None:
+            with _build_lock:
+                if self._value is None:
+                    import chat_model  # LangChain itself, imported first so its warnings stay muted
+
+                    with span(f"build:{self.name}"):
+                        self._value = self._factory()
+        return self._value
+
+
+class LazyChain(Lazy):
+    """An LLMChain over one prompt template and the task's shared model, built on first use.
+
+    The template and output_key are known up front, so prompts can be fingerprinted and outputs
+    routed without building the chain.
+    """
+
+    def __init__(self, task: str, template: str, output_key: str = "text", **chain_kwargs: Any):
+        self.task = task
+        self.template = template
+        self.output_key = output_key
+        self._chain_kwargs = chain_kwargs
+        super().__init__(f"{task}.{output_key}", self._build)
+
+    def _build(self) -> "LLMChain":
+        from langchain.chains import LLMChain
+        from langchain.prompts import PromptTemplate
+
+        return LLMChain(
+            llm=get_llm(self.task),
+            prompt=PromptTemplate.from_template(self.template),
+            output_key=self.output_key,
+            **self._chain_kwargs,
+        )
+
+    async def ainvoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.get().ainvoke(inputs)
+
+
+def warm_up() -> None:
+    """Build every model and lazy object now instead of on first use. A request that needs one
+    while this runs waits for it to be built."""
+    for task in TASK_TEMPERATURES:
+        get_llm(task)
+    for lazy in list(_lazy_objects):
+        lazy.get()
+
+
+############ Connection pool #################
+
+async def open_pool() -> None:
+    """Share keep-alive HTTP connections between all OpenAI calls. Call once the event loop is running.
+
+    The pinned openai 0.28 client opens a fresh aiohttp session per async request unless
+    openai.aiosession has one. It is a ContextVar, and a value set at startup would not reach
+    request handlers, so the shared session is installed as its default instead.
+    """
+    connector = aiohttp.TCPConnector(limit=LLM_POOL_SIZE, keepalive_timeout=30)
+    openai.aiosession = ContextVar("openai_aiosession", default=aiohttp.ClientSession(connector=connector))
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE))
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE))
+    openai.requestssession = session
+
+
+async def close_pool() -> None:
+    session = openai.aiosession.get()
+    if session is not None:
+        await session.close()
+    openai.aiosession = ContextVar("openai_aiosession", default=None)
+
+    if isinstance(openai.requestssession, requests.Session):
+        openai.requestssession.close()
+    openai.requestssession = None
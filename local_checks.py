@@ -0,0 +1,249 @@
+# local_checks.py
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from job_rank import SKILL_TERMS
+from resume_parser import SECTION_HEADINGS
+
+try:
+    from spellchecker import SpellChecker  # pyspellchecker
+except ImportError:  # spelling then always goes to the LLM
+    SpellChecker = None
+
+
+# Sections answered locally when the result is unambiguous; the LLM chain runs otherwise
+LOCAL_CHECKS = {key.strip() for key in os.getenv("LOCAL_CHECKS", "personal_info,spelling").split(",") if key.strip()}
+
+# More suspected typos than this and the local spelling check defers to the LLM
+SPELLCHECK_MAX_TYPOS = int(os.getenv("SPELLCHECK_MAX_TYPOS", "5"))
+
+
+@dataclass
+class LocalCheck:
+    """A section produced without an LLM call (None if the LLM is needed), and how long the check took."""
+    key: str
+    content: Optional[str]
+    seconds: float
+
+
+############ Personal info #################
+
+INFO_LEAD = ("This is the personal information we were able to extract from your resume. "
+             "If anything is missing, there may be an issue with your formatting:")
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_PHONE_RE = re.compile(r"(?<![\d/])(?:\+\d{1,3}[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?![\d/])")
+_URL_RE = re.compile(r"(?:https?://|www\.)[^\s|,;)]+|(?:linkedin\.com|github\.com)/[^\s|,;)]+", re.IGNORECASE)
+# "Boston, MA" or "Toronto, Ontario"
+_LOCATION_RE = re.compile(r"\b([A-Z][a-zA-Z.'-]+(?: [A-Z][a-zA-Z.'-]+){0,2}), ((?:[A-Z]{2}|[A-Z][a-z]+(?: [A-Z][a-z]+)?))\b")
+_NAME_RE = re.compile(r"^[A-Z][a-zA-Z.'-]+(?: [A-Z][a-zA-Z.'-]+){1,3}$")
+
+# What may follow the comma of a location found away from the email/phone line
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California", "CO": "Colorado",
+    "CT": "Connecticut", "DE": "Delaware", "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho",
+    "IL": "Illinois", "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York", "NC": "North Carolina",
+    "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania",
+    "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas",
+    "UT": "Utah", "VT": "Vermont", "VA": "Virginia", "WA": "Washington", "WV": "West Virginia",
+    "WI": "Wisconsin", "WY": "Wyoming", "DC": "District of Columbia",
+}
+CA_PROVINCES = {
+    "AB": "Alberta", "BC": "British Columbia", "MB": "Manitoba", "NB": "New Brunswick", "NL": "Newfoundland",
+    "NS": "Nova Scotia", "ON": "Ontario", "PE": "Prince Edward Island", "QC": "Quebec", "SK": "Saskatchewan",
+}
+COUNTRIES = {
+    "USA", "US", "UK", "UAE", "Argentina", "Australia", "Austria", "Bangladesh", "Belgium", "Brazil", "Canada",
+    "Chile", "China", "Colombia", "Czechia", "Denmark", "Egypt", "England", "Finland", "France", "Germany",
+    "Ghana", "Greece", "Hungary", "India", "Indonesia", "Ireland", "Israel", "Italy", "Japan", "Kenya",
+    "Korea", "Malaysia", "Mexico", "Netherlands", "New Zealand", "Nigeria", "Norway", "Pakistan", "Peru",
+    "Philippines", "Poland", "Portugal", "Romania", "Scotland", "Singapore", "South Africa", "South Korea",
+    "Spain", "Sweden", "Switzerland", "Taiwan", "Thailand", "Turkey", "Ukraine", "Vietnam", "Wales",
+}
+REGIONS = set(US_STATES) | set(US_STATES.values()) | set(CA_PROVINCES) | set(CA_PROVINCES.values()) | COUNTRIES
+
+# Words that make a capitalized line a heading or job title rather than a name or a city
+_NOT_NAME_WORDS = frozenset(
+    word for headings in SECTION_HEADINGS.values() for heading in headings for word in heading.split()
+) | frozenset("""
+resume curriculum vitae cv contact information personal details portfolio page
+engineer developer programmer scientist analyst manager director designer consultant specialist
+architect administrator intern assistant associate coordinator officer lead senior junior principal
+head president founder owner accountant teacher nurse student graduate researcher
+""".split()) - {"about"}
+
+
+def _is_title(text: str) -> bool:
+    return any(word.lower().strip(".") in _NOT_NAME_WORDS for word in text.split())
+
+
+def _find_location(lines: Sequence[str]) -> str:
+    """The first "City, Region" whose region is a known state/province/country, or that shares a
+    line with the email or phone number. "Data Scientist, Spotify" is neither."""
+    for line in lines:
+        on_contact_line = bool(_EMAIL_RE.search(line) or _PHONE_RE.search(line))
+        for match in _LOCATION_RE.finditer(line):
+            city, region = match.groups()
+            if _is_title(city) or _is_title(region):
+                continue
+            if region in REGIONS or on_contact_line:
+                return match.group(0)
+    return ""
+
+
+def _url_key(url: str) -> str:
+    # "https://www.linkedin.com/in/jane/" and "linkedin.com/in/jane" are the same link
+    return re.sub(r"^(?:https?://)?(?:www\.)?", "", url.lower()).rstrip("/")
+
+
+def extract_contact(text: str, links: Sequence[str] = ()) -> Dict[str, str]:
+    """Contact fields found in `text` (ideally the contact block) and the PDF's link annotations."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    uris = [uri for uri in links if uri]
+
+    emails = _EMAIL_RE.findall(text) + [uri[len("mailto:"):] for uri in uris if uri.lower().startswith("mailto:")]
+    phones = _PHONE_RE.findall(text) + [uri[len("tel:"):] for uri in uris if uri.lower().startswith("tel:")]
+    urls = {}
+    # Annotation URIs first: they are complete even when the visible text is shortened
+    for url in [uri for uri in uris if not uri.lower().startswith(("mailto:", "tel:"))] + _URL_RE.findall(text):
+        url = url.rstrip(".")
+        urls.setdefault(_url_key(url), url)
+    urls = list(urls.values())
+    linkedin = [url for url in urls if "linkedin.com" in url.lower()]
+
+    return {
+        "name": next((line for line in lines[:5] if _NAME_RE.match(line) and not _is_title(line)), ""),
+        "email": emails[0] if emails else "",
+        "phone": phones[0].strip() if phones else "",
+        "location": _find_location(lines[:10]),
+        "linkedin": linkedin[0] if linkedin else "",
+        "other_links": ", ".join(url for url in urls if url not in linkedin),
+    }
+
+
+def local_personal_info(text: str, links: Sequence[str] = ()) -> Optional[str]:
+    """The personal_info section, or None if a field regexes can't rule out (name, email, location)
+    is missing. Phone numbers and links are reliable enough to leave blank when not found."""
+    contact = extract_contact(text, links)
+    if not (contact["name"] and contact["email"] and contact["location"]):
+        return None
+    return "\n".join([
+        INFO_LEAD,
+        "",
+        f"**Name:** {contact['name']}  ",
+        f"**Email:** {contact['email']}  ",
+        f"**Phone Number:** {contact['phone']}  ",
+        f"**Location:** {contact['location']}  ",
+        f"**LinkedIn:** {contact['linkedin']}  ",
+        f"**Other Links:** {contact['other_links']}",
+    ])
+
+
+############ Spelling #################
+
+NO_SPELLING_ERRORS = "Good job! No spelling errors detected."
+
+# Words a general dictionary doesn't know but resumes use all the time
+TECH_TERMS = frozenset("""
+api apis backend frontend fullstack devops devsecops mlops dataset datasets pipeline pipelines
+microservice microservices kubernetes postgres postgresql mongodb redis kafka graphql webpack
+typescript javascript nodejs reactjs vuejs nextjs django fastapi pytorch tensorflow numpy pandas
+scikit jupyter matplotlib tableau powerbi snowflake databricks airflow terraform ansible jenkins
+github gitlab bitbucket jira confluence figma salesforce hubspot quickbooks ux ui saas paas iaas
+chatbot chatbots llm llms nlp etl crm erp kpi kpis roi seo sem b2b b2c onboarding offboarding
+scalable scalability refactor refactored refactoring dockerized containerized serverless
+linting repo repos config configs async middleware runtime hackathon hackathons internship
+cybersecurity blockchain fintech edtech healthtech proactively upskilled
+""".split()) | frozenset(term for term in SKILL_TERMS if " " not in term)
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z']*[A-Za-z]")
+
+_spell = None
+_spell_lock = threading.Lock()
+
+
+def _checker():
+    # Loading the dictionary takes most of a second; warm_up() does it at start-up
+    global _spell
+    if _spell is None:
+        with _spell_lock:
+            if _spell is None:
+                spell = SpellChecker()
+                spell.word_frequency.load_words(TECH_TERMS)
+                _spell = spell
+    return _spell
+
+
+def warm_up() -> None:
+    """Load what the enabled local checks need now instead of in the first request."""
+    if "spelling" in LOCAL_CHECKS and SpellChecker is not None:
+        _checker()
+
+
+def _candidate_words(text: str) -> List[str]:
+    """Words worth checking. Mid-sentence capitals are proper nouns (companies, schools) and
+    acronyms/camelCase are product names, so those are skipped."""
+    words = []
+    for line in text.splitlines():
+        line_start = True
+        for match in _WORD_RE.finditer(line):
+            word = match.group(0)
+            sentence_start = line_start or line[:match.start()].rstrip().endswith((".", "!", "?", ":", "•", "-"))
+            line_start = False
+            if len(word) <= 2 or any(ch.isupper() for ch in word[1:]):
+                continue
+            if word[0].isupper() and not sentence_start:
+                continue
+            words.append(word)
+    return words
+
+
+def local_spelling(text: str) -> Optional[str]:
+    """The spelling section from a dictionary check, or None if it can't decide on its own:
+    no dictionary installed, an unknown word without a likely correction (often a proper noun
+    or jargon), or more suspected typos than SPELLCHECK_MAX_TYPOS."""
+    if SpellChecker is None:
+        return None
+    spell = _checker()
+    words = _candidate_words(text)
+    unknown = spell.unknown(word.lower() for word in words)
+    if not unknown:
+        return NO_SPELLING_ERRORS
+
+    typos = {}
+    for word in words:
+        lowered = word.lower()
+        if lowered not in unknown or lowered in typos:
+            continue
+        correction = spell.correction(lowered)
+        if not correction or correction == lowered or word[0].isupper():
+            # A capitalized unknown word at the start of a line may just be a name
+            return None
+        typos[lowered] = (word, correction)
+        if len(typos) > SPELLCHECK_MAX_TYPOS:
+            return None
+
+    return "\n".join(f"- **{word}** → {correction}" for word, correction in typos.values())
+
+
+############ Fast path #################
+
+def run_local_checks(inputs: Dict[str, str], links: Sequence[str] = ()) -> List[LocalCheck]:
+    """Run the enabled local checks on `inputs` (section key -> text the chain would read)."""
+    checks = {"personal_info": lambda text: local_personal_info(text, links), "spelling": local_spelling}
+    results = []
+    for key, check in checks.items():
+        if key not in LOCAL_CHECKS or key not in inputs:
+            continue
+        start = time.perf_counter()
+        content = check(inputs[key])
+        results.append(LocalCheck(key, content, time.perf_counter() - start))
+    return results
@@ -1,16 +1,132 @@
 # main.py
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+import asyncio
+import json
+import time
+from typing import Collection, List, Optional, Set, Tuple
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from analysis import analyze_resume
-from chatbot import extract_text_from_pdf, get_or_create_chatbot
-from job_match import run_job_match
-from revision import rewrite_resume
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import Headers
+from analysis import ANALYSIS_CHAINS, analysis_calls, analyze_resume, iter_sections, reanalysis_keys, reanalyze_resume, PROMPT_VERSION as ANALYSIS_PROMPT_VERSION
+from chatbot import CHAT_MEMORY_MODE, apply_compaction, chat_reply, needs_compaction, plan_compaction, stream_chat_reply
+from job_match import JOB_MATCH_BATCH_MAX, JOB_RANK_BATCH_MAX, prerank_job_descriptions, run_job_match, run_job_match_batch, PROMPT_VERSION as JOB_MATCH_PROMPT_VERSION
+from revision import rewrite_resume, stream_rewrite, PROMPT_VERSION as REVISION_PROMPT_VERSION
+from session_store import Session, SessionStore, create_session_store
+from resume_store import MAX_UPLOAD_BYTES, ParsedResume, check_pdf_header, start_parse_pool, stop_parse_pool
+from job_queue import DONE, FAILED, JobQueue, JobWorkers, idempotency_key
+from admission import Admission, create_limiter_state
+from result_cache import ResultCache, cache_key
+from llm_client import LLM_WARMUP, close_pool, open_pool, warm_up
+import local_checks
+import metrics
+from metrics import span
 from fastapi.responses import PlainTextResponse
+from dataclasses import asdict
+
+
+async def warm_up_app():
+    """Start the PDF parsing workers, load the local checks' dictionary and, unless LLM_WARMUP=off,
+    import LangChain and build the chains."""
+    steps = [start_parse_pool(), asyncio.to_thread(local_checks.warm_up)]
+    if LLM_WARMUP != "off":
+        steps.append(asyncio.to_thread(warm_up))
+    await asyncio.gather(*steps)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if LLM_WARMUP not in ("background", "startup", "off"):
+        raise ValueError(f"Unknown LLM_WARMUP: {LLM_WARMUP!r}")
+    global jobs, job_workers, sessions, result_cache
+    await open_pool()  # keep-alive connections shared by every LLM call
+    sessions = create_session_store()
+    result_cache = ResultCache()
+    jobs = JobQueue()
+    job_workers = JobWorkers(jobs, JOB_HANDLERS)
+    job_workers.start()
+    # In the background by default, so /health answers as soon as the app is imported
+    warming = asyncio.create_task(warm_up_app())
+    if LLM_WARMUP == "startup":
+        await warming
+    yield
+    warming.cancel()
+    for task in list(chat_compactions):
+        task.cancel()  # compaction is retried after the user's next turn
+    await job_workers.stop()
+    jobs.close()
+    sessions.close()  # writes any checkpoints still queued
+    result_cache.close()
+    stop_parse_pool()
+    await close_pool()
+
+
+# Routes that take a resume upload, and the largest request body they accept: the file plus room
+# for the other form fields and the multipart framing
+UPLOAD_PATHS = {"/analyze", "/analyze/stream", "/chatbot/load", "/jobs/analyze"}
+MAX_UPLOAD_REQUEST_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+UPLOAD_TOO_LARGE = "Resume file is too large. Max allowed size is 2MB."
+
+
+class UploadSizeLimit:
+    """Turn away oversized uploads before their body is received.
+
+    Form fields are parsed (and the whole multipart body spooled) before any handler or dependency
+    runs, so this is checked at the ASGI level: by Content-Length when the client sends one,
+    otherwise by reading at most MAX_UPLOAD_REQUEST_BYTES of the body and replaying it to the app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length")
+        if length is not None:
+            if not length.isdigit() or int(length) > MAX_UPLOAD_REQUEST_BYTES:
+                await self.reject(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) > MAX_UPLOAD_REQUEST_BYTES:
+                await self.reject(scope, receive, send)
+                return
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()  # the disconnect, once the response is sent
+            replayed = True
+            return {"type": "http.request", "body": bytes(body), "more_body": False}
+
+        await self.app(scope, replay, send)
 
-app = FastAPI()
+    @staticmethod
+    async def reject(scope, receive, send):
+        response = JSONResponse(status_code=400, content={"detail": UPLOAD_TOO_LARGE}, headers={"Connection": "close"})
+        await response(scope, receive, send)
 
+
+app = FastAPI(lifespan=lifespan)
+
+# Inside CORSMiddleware, so browsers can read the rejection
+app.add_middleware(UploadSizeLimit)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -25,8 +141,118 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory per-user data
-user_memory = {}  # { user_id: file_bytes }
+# Per-user data (parsed resume + chat history), bounded by size and idle time.
+# In this process by default, or shared between workers with SESSION_BACKEND=sqlite.
+# Opened in lifespan, so importing the app doesn't create (or write resumes to) its files.
+sessions: Optional[SessionStore] = None  # { user_id: Session }
+
+# Opt-in cache of analysis / job match / revision results, keyed by resume text + prompt version.
+# Opened in lifespan, so importing the app doesn't open its on-disk tier.
+result_cache: Optional[ResultCache] = None
+
+# Background /analyze and /revision jobs, persisted in SQLite and run by a worker pool in each process.
+# Opened in lifespan, so importing the app doesn't create the queue file.
+jobs: Optional[JobQueue] = None
+job_workers: Optional[JobWorkers] = None
+
+# Per-user token buckets and a global in-flight budget, counted in LLM calls per request
+admission = Admission(create_limiter_state())
+ANALYSIS_CALLS = analysis_calls()
+
+
+def collect_store_metrics():
+    if sessions is not None:
+        session_stats = sessions.stats()
+        metrics.SESSIONS.set(session_stats["entries"])
+        metrics.SESSION_BYTES.set(session_stats["bytes"])
+        metrics.SESSION_EVICTIONS.set_total(session_stats["evictions"], reason="budget")
+        metrics.SESSION_EVICTIONS.set_total(session_stats["expirations"], reason="ttl")
+        metrics.SESSION_REHYDRATIONS.set_total(session_stats.get("rehydrations", 0))
+
+    if result_cache is not None:
+        cache_stats = result_cache.stats()
+        metrics.CACHE_ENTRIES.set(cache_stats["entries"])
+        for endpoint, count in cache_stats["hits"].items():
+            metrics.CACHE_LOOKUPS.set_total(count, endpoint=endpoint, outcome="hit")
+        for endpoint, count in cache_stats["misses"].items():
+            metrics.CACHE_LOOKUPS.set_total(count, endpoint=endpoint, outcome="miss")
+
+    if jobs is not None:
+        for status, count in jobs.stats().items():
+            metrics.JOBS.set(count, status=status)
+    metrics.ADMISSION_IN_FLIGHT.set(admission.state.in_flight())
+
+
+metrics.register_collector(collect_store_metrics)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        path=route.path if route is not None else "unmatched",
+        method=request.method,
+        status=response.status_code,
+    )
+    return response
+
+
+async def require_session(user_id: str, missing_detail: str) -> Session:
+    """Look up a user's session, telling apart never-uploaded from evicted."""
+    session = await asyncio.to_thread(sessions.get, user_id)
+    if session is not None:
+        return session
+    if await asyncio.to_thread(sessions.was_evicted, user_id):
+        raise HTTPException(status_code=404, detail="Your session has expired. Please upload your resume again.")
+    raise HTTPException(status_code=404, detail=missing_detail)
+
+
+# Uploads are read in chunks so a file over MAX_UPLOAD_BYTES (in a request UploadSizeLimit let
+# through) is rejected without being read into memory
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+async def read_resume_upload(file: UploadFile) -> bytes:
+    """Read an uploaded resume, rejecting non-PDFs and files over MAX_UPLOAD_BYTES as early as possible."""
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF resumes are supported.")
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail=UPLOAD_TOO_LARGE)
+
+    chunks = []
+    total = 0
+    with span("upload_read"):
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            if not chunks:
+                try:
+                    check_pdf_header(chunk)
+                except ValueError as ve:
+                    raise HTTPException(status_code=400, detail=str(ve))
+            total += len(chunk)
+            # File size check
+            if total > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=400, detail=UPLOAD_TOO_LARGE)
+            chunks.append(chunk)
+
+    if not chunks:
+        raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+    return b"".join(chunks)
+
+
+def sse_event(data: dict, event: str = "message") -> str:
+    """One Server-Sent Events frame. Data is JSON so tokens with newlines survive intact."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 ############ Health ###################3
@@ -39,25 +265,84 @@ def health_check():
 def root():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target: latency histograms, token counts, cache and session store stats."""
+    return PlainTextResponse(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 ############ Analysis #################
 
-@app.post("/analyze")
-async def analyze(user_id: str = Form(...), file: UploadFile = File(...)):
-    if not file.filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF resumes are supported.")
+def incremental_base(previous: Optional[Session], no_cache: bool) -> Optional[Session]:
+    """The user's previous session, if its stored analysis can seed an incremental re-analysis."""
+    if no_cache or previous is None or not previous.analysis:
+        return None
+    return previous if previous.analysis_version == ANALYSIS_PROMPT_VERSION else None
+
+
+async def remember_analysis(
+    user_id: str, result: dict, previous: Optional[Session] = None, reused: Collection[str] = ()
+) -> None:
+    """Keep the analysis with the user's session, so the next upload can be re-analyzed incrementally.
+    `reused` outputs were carried over from `previous`."""
+    session = await asyncio.to_thread(sessions.get, user_id)
+    if session is None or session.resume.text != result["resume"]:
+        return  # the session was evicted or replaced by a newer upload meanwhile
+    outputs = {chain.output_key: result[chain.output_key] for chain in ANALYSIS_CHAINS}
+    session.remember_analysis(outputs, ANALYSIS_PROMPT_VERSION, previous, reused)
+    await asyncio.to_thread(sessions.put, session)
+
+
+def analysis_bases(previous: Session) -> dict:
+    """The resume each of the previous analysis's outputs was computed from."""
+    return {chain.output_key: previous.analysis_base(chain.output_key) for chain in ANALYSIS_CHAINS}
 
-    file_bytes = await file.read()
-    
-    # File size check
-    if len(file_bytes) > 2 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Resume file is too large. Max allowed size is 2MB.")
-    
-    user_memory[user_id] = file_bytes  # Store resume for chatbot
+
+async def cached_analysis(
+    resume: ParsedResume, no_cache: bool = False, previous: Optional[Session] = None
+) -> Tuple[dict, List[str], List[str]]:
+    """Analysis of a resume, which output sections had to be computed for it (none from the result
+    cache, the affected ones when re-analyzing from `previous`, otherwise all of them) and which
+    were reused from `previous`. Only complete analyses of this text are cached."""
+    key = cache_key("analyze", ANALYSIS_PROMPT_VERSION, resume.text)
+    result = await result_cache.lookup("analyze", key, bypass=no_cache)
+    if result is not None:
+        return result, [], []
+
+    if previous is not None:
+        result, recomputed = await reanalyze_resume(
+            resume.text, resume.sections, resume.links, analysis_bases(previous), previous.analysis,
+        )
+    else:
+        result = await analyze_resume(resume.text, resume.sections, resume.links)
+        recomputed = [chain.output_key for chain in ANALYSIS_CHAINS]
+    reused = [chain.output_key for chain in ANALYSIS_CHAINS if chain.output_key not in recomputed]
+    if not reused:
+        await result_cache.store("analyze", key, result)
+    return result, recomputed, reused
+
+
+@app.post("/analyze", dependencies=[Depends(admission.limit("analyze", ANALYSIS_CALLS))])
+async def analyze(
+    request: Request,
+    user_id: str = Form(...),
+    file: UploadFile = File(...),
+    no_cache: bool = Form(False),
+    incremental: bool = Form(True),
+):
+    """Analyze an uploaded resume. When the user analyzed an earlier version, only the output
+    sections its changes affect are recomputed (listed under "recomputed"); pass incremental=false
+    or no_cache=true to recompute everything."""
+    file_bytes = await read_resume_upload(file)
+    previous = incremental_base(await asyncio.to_thread(sessions.get, user_id), no_cache) if incremental else None
 
     try:
-        result = analyze_resume(file_bytes)  # might raise page len error
-        return result
+        resume = await sessions.load(user_id, file_bytes)  # Store resume for chatbot, might raise page len error
+        result, recomputed, reused = await cached_analysis(resume, no_cache, previous)
+        await remember_analysis(user_id, result, previous, reused)
+        # A cache hit or an incremental run makes fewer calls than it was charged for
+        admission.record_calls(request, len(recomputed))
+        return {**result, "recomputed": recomputed}
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -65,50 +350,193 @@ async def analyze(user_id: str = Form(...), file: UploadFile = File(...)):
 
 
 
+@app.post("/analyze/stream", dependencies=[Depends(admission.limit("analyze", ANALYSIS_CALLS))])
+async def analyze_stream(
+    request: Request,
+    user_id: str = Form(...),
+    file: UploadFile = File(...),
+    no_cache: bool = Form(False),
+    incremental: bool = Form(True),
+):
+    """Progressive /analyze: a `section` (or `section_error`) event per section as soon as it is
+    ready, then a `summary` event with per-section timings. Sections reused from the previous
+    analysis (see /analyze) come first, marked `"reused": true`."""
+    file_bytes = await read_resume_upload(file)
+    previous = incremental_base(await asyncio.to_thread(sessions.get, user_id), no_cache) if incremental else None
+
+    try:
+        resume = await sessions.load(user_id, file_bytes)  # Store resume for chatbot, might raise page len error
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    key = cache_key("analyze", ANALYSIS_PROMPT_VERSION, resume.text)
+    cached = await result_cache.lookup("analyze", key, bypass=no_cache)
+
+    async def events():
+        if cached is not None:
+            admission.record_calls(request, 0)
+            for chain in ANALYSIS_CHAINS:
+                yield sse_event({"key": chain.output_key, "content": cached[chain.output_key]}, event="section")
+            await remember_analysis(user_id, cached)
+            yield sse_event({"timings": {}, "failed": [], "cached": True, "recomputed": []}, event="summary")
+            return
+
+        keys = [chain.output_key for chain in ANALYSIS_CHAINS]
+        result = {"resume": resume.text}
+        if previous is not None:
+            keys = reanalysis_keys(resume.text, resume.sections, analysis_bases(previous), previous.analysis)
+            for chain in ANALYSIS_CHAINS:
+                if chain.output_key not in keys:
+                    result[chain.output_key] = previous.analysis[chain.output_key]
+                    yield sse_event(
+                        {"key": chain.output_key, "content": result[chain.output_key], "reused": True}, event="section"
+                    )
+        # Like /analyze, only the sections recomputed are charged (settled once the stream has been sent)
+        admission.record_calls(request, len(keys))
+
+        timings = {}
+        failed = []
+        if keys:
+            async for section in iter_sections(resume.text, resume.sections, resume.links, keys=keys):
+                timings[section.key] = round(section.seconds, 3)
+                if section.error:
+                    failed.append(section.key)
+                    yield sse_event({"key": section.key, "detail": section.error}, event="section_error")
+                else:
+                    result[section.key] = section.content
+                    yield sse_event({"key": section.key, "content": section.content}, event="section")
+
+        if not failed:
+            reused = [chain.output_key for chain in ANALYSIS_CHAINS if chain.output_key not in keys]
+            if not reused:
+                await result_cache.store("analyze", key, result)
+            await remember_analysis(user_id, result, previous, reused)
+        yield sse_event({"timings": timings, "failed": failed, "cached": False, "recomputed": keys}, event="summary")
+
+    return sse_response(events())
+
+
+
 ############ Chatbot #################
 
 @app.post("/chatbot/load")
 async def load_resume_for_chatbot(user_id: str = Form(...), file: UploadFile = File(...)):
-    if not file.filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF resumes are supported.")
-    file_bytes = await file.read()
-    
-    # File size check
-    if len(file_bytes) > 2 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Resume file is too large. Max allowed size is 2MB.")
-    
-    user_memory[user_id] = file_bytes
+    file_bytes = await read_resume_upload(file)
+
+    try:
+        await sessions.load(user_id, file_bytes)  # might raise page len error
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     return {"status": "ok", "message": "Resume loaded into chatbot memory."}
 
-@app.post("/chatbot/respond")
+# Users whose chat history is being compacted, and the tasks doing it
+compacting_users: Set[str] = set()
+chat_compactions: Set[asyncio.Task] = set()
+
+
+async def compact_chat(user_id: str) -> None:
+    """Fold the user's older chat turns into their summary. Runs after the reply has been sent, so
+    no turn waits on the summarizer; its LLM call is charged to the user's rate limit."""
+    try:
+        session = await asyncio.to_thread(sessions.get, user_id)
+        if session is None or not needs_compaction(session):
+            return
+        if CHAT_MEMORY_MODE == "summary":
+            await admission.charge(user_id, 1)
+        compaction = await plan_compaction(session)
+        if compaction is None:
+            return
+        # Another worker (sqlite backend) may have stored a newer turn meanwhile
+        latest = await asyncio.to_thread(sessions.get, user_id)
+        if latest is not None and apply_compaction(latest, *compaction):
+            await asyncio.to_thread(sessions.put, latest)
+    finally:
+        compacting_users.discard(user_id)
+
+
+def schedule_compaction(session: Session) -> None:
+    """Compact the session's history in the background if it is over budget, one run per user at a time."""
+    if session.user_id in compacting_users or not needs_compaction(session):
+        return
+    compacting_users.add(session.user_id)
+    task = asyncio.create_task(compact_chat(session.user_id))
+    chat_compactions.add(task)
+    task.add_done_callback(chat_compactions.discard)
+
+
+@app.post("/chatbot/respond", dependencies=[Depends(admission.limit("chatbot", 1))])
 async def resume_chat(user_id: str = Form(...), message: str = Form(...)):
-    if user_id not in user_memory:
-        raise HTTPException(status_code=404, detail="No resume found in chatbot memory. Please reload it.")
+    session = await require_session(user_id, "No resume found in chatbot memory. Please reload it.")
     try:
-        resume_bytes = user_memory[user_id]
-        resume_text = extract_text_from_pdf(resume_bytes)  # might raise page length error
-        chain = get_or_create_chatbot(user_id, resume_text)
-        response = chain.run(message)
-        return JSONResponse(content={"response": response})
+        reply = await chat_reply(session, message)
+        await asyncio.to_thread(sessions.put, session)
+        schedule_compaction(session)
+        return JSONResponse(content=reply)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chatbot error: {str(e)}")
 
+@app.post("/chatbot/respond/stream", dependencies=[Depends(admission.limit("chatbot", 1))])
+async def resume_chat_stream(user_id: str = Form(...), message: str = Form(...)):
+    """Streaming /chatbot/respond: `token` events as they arrive, then `done` with the full reply
+    and the prompt's estimated tokens."""
+    session = await require_session(user_id, "No resume found in chatbot memory. Please reload it.")
+
+    async def events():
+        reply = []
+        usage = {}
+        try:
+            async for token in stream_chat_reply(session, message, usage):
+                reply.append(token)
+                yield sse_event({"token": token}, event="token")
+            await asyncio.to_thread(sessions.put, session)
+            schedule_compaction(session)
+            yield sse_event({"response": "".join(reply), "prompt_tokens": usage["prompt_tokens"]}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": f"Chatbot error: {str(e)}"}, event="error")
+
+    return sse_response(events())
+
+
+@app.post("/chatbot/export")
+async def export_chat(user_id: str = Form(...)):
+    """The user's conversation in the compact session format, to import again later or elsewhere."""
+    session = await require_session(user_id, "No resume found in chatbot memory. Please reload it.")
+    return session.chat_state()
+
+
+@app.post("/chatbot/import")
+async def import_chat(user_id: str = Form(...), session_state: str = Form(...)):
+    """Continue an exported conversation. The user must have loaded the same resume first."""
+    session = await require_session(user_id, "No resume found in chatbot memory. Please load it first.")
+    try:
+        session.restore_chat(json.loads(session_state))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    await asyncio.to_thread(sessions.put, session)
+    return {"status": "ok", "messages": len(session.history)}
+
     
     
     
 ############ Job Match #################
 
-@app.post("/jobmatch")
-async def job_match(user_id: str = Form(...), job_description: str = Form(...)):
-    if user_id not in user_memory:
-        raise HTTPException(status_code=404, detail="Resume not found. Please upload first.")
+async def cached_job_match(resume_text: str, job_description: str, no_cache: bool = False) -> dict:
+    key = cache_key("jobmatch", JOB_MATCH_PROMPT_VERSION, resume_text, job_description)
+    result = await result_cache.lookup("jobmatch", key, bypass=no_cache)
+    if result is None:
+        result = await run_job_match(resume_text, job_description)
+        await result_cache.store("jobmatch", key, result)
+    return result
+
+
+@app.post("/jobmatch", dependencies=[Depends(admission.limit("jobmatch", 1))])
+async def job_match(user_id: str = Form(...), job_description: str = Form(...), no_cache: bool = Form(False)):
+    session = await require_session(user_id, "Resume not found. Please upload first.")
 
     try:
-        resume_bytes = user_memory[user_id]
-        resume_text = extract_text_from_pdf(resume_bytes)  # might raise page len error
-        result = run_job_match(resume_text, job_description)
+        result = await cached_job_match(session.resume.text, job_description, no_cache)
         return result
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -118,22 +546,180 @@ async def job_match(user_id: str = Form(...), job_description: str = Form(...)):
         raise HTTPException(status_code=500, detail=f"Job match failed: {str(e)}")
 
 
+def job_match_batch_cost(form) -> int:
+    """LLM calls a batch makes: one per job description, or per top_k pre-ranked one. Batches over
+    JOB_MATCH_BATCH_MAX are turned away here, before admission charges or queues them."""
+    total = len(form.getlist("job_descriptions"))
+    if total > JOB_MATCH_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many job descriptions. Max allowed is {JOB_MATCH_BATCH_MAX}.")
+    try:
+        top_k = int(form.get("top_k") or 0)
+    except ValueError:
+        top_k = 0
+    return min(total, top_k) if top_k > 0 else total
+
+
+@app.post("/jobmatch/batch", dependencies=[Depends(admission.limit("jobmatch", job_match_batch_cost))])
+async def job_match_batch(
+    user_id: str = Form(...),
+    job_descriptions: List[str] = Form(...),
+    top_k: int = Form(0),
+    no_cache: bool = Form(False),
+):
+    """Match the stored resume against every `job_descriptions` field, ranked best fit first.
+
+    Failed items are reported under "errors" instead of failing the whole batch. With `top_k`,
+    only the top_k postings by local pre-rank score are sent to the LLM.
+    """
+    session = await require_session(user_id, "Resume not found. Please upload first.")
+
+    # The resume was parsed once at upload; every item reuses the same text
+    resume_text = session.resume.text
+
+    async def match(resume_text: str, job_description: str) -> dict:
+        return await cached_job_match(resume_text, job_description, no_cache)
+
+    batch = await run_job_match_batch(resume_text, job_descriptions, match, top_k=top_k)
+    return {
+        "total": len(job_descriptions),
+        "succeeded": len(batch["results"]),
+        "resume_tokens": session.resume.token_estimate,
+        **batch,
+    }
+
+
+@app.post("/jobmatch/rank", dependencies=[Depends(admission.limit("jobrank", 1))])
+async def job_match_rank(user_id: str = Form(...), job_descriptions: List[str] = Form(...)):
+    """Coarse, local relevance of each posting to the stored resume (TF-IDF + skill overlap, no LLM)."""
+    session = await require_session(user_id, "Resume not found. Please upload first.")
+    if len(job_descriptions) > JOB_RANK_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many job descriptions. Max allowed is {JOB_RANK_BATCH_MAX}.")
+
+    # Vectorizing new postings is CPU work; keep it off the event loop
+    with span("job_match:prerank"):
+        ranked = await asyncio.to_thread(prerank_job_descriptions, session.resume.text, job_descriptions)
+    return {"total": len(job_descriptions), "ranked": ranked}
+
+
 
 ############ Revision Mode #################
 
+async def cached_revision(resume_text: str, no_cache: bool = False) -> str:
+    key = cache_key("revision", REVISION_PROMPT_VERSION, resume_text)
+    rewritten_text = await result_cache.lookup("revision", key, bypass=no_cache)
+    if rewritten_text is None:
+        rewritten_text = await rewrite_resume(resume_text)
+        await result_cache.store("revision", key, rewritten_text)
+    return rewritten_text
+
 
-@app.post("/revision")
-async def revision_mode(user_id: str = Form(...)):
-    if user_id not in user_memory:
-        raise HTTPException(status_code=404, detail="No resume found. Please load it first.")
+@app.post("/revision", dependencies=[Depends(admission.limit("revision", 1))])
+async def revision_mode(user_id: str = Form(...), no_cache: bool = Form(False)):
+    session = await require_session(user_id, "No resume found. Please load it first.")
 
     try:
-        file_bytes = user_memory[user_id]
-        resume_text = extract_text_from_pdf(file_bytes)
-        rewritten_text = rewrite_resume(resume_text)
+        rewritten_text = await cached_revision(session.resume.text, no_cache)
         return PlainTextResponse(content=rewritten_text)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Resume rewrite failed: {str(e)}")
 
+
+@app.post("/revision/stream", dependencies=[Depends(admission.limit("revision", 1))])
+async def revision_mode_stream(user_id: str = Form(...), no_cache: bool = Form(False)):
+    """Streaming /revision: markdown `token` events as they arrive, then an empty `done` event."""
+    session = await require_session(user_id, "No resume found. Please load it first.")
+    key = cache_key("revision", REVISION_PROMPT_VERSION, session.resume.text)
+    cached = await result_cache.lookup("revision", key, bypass=no_cache)
+
+    async def events():
+        if cached is not None:
+            yield sse_event({"token": cached}, event="token")
+            yield sse_event({}, event="done")
+            return
+
+        rewritten = []
+        try:
+            async for token in stream_rewrite(session.resume.text):
+                rewritten.append(token)
+                yield sse_event({"token": token}, event="token")
+            await result_cache.store("revision", key, "".join(rewritten))
+            yield sse_event({}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": f"Resume rewrite failed: {str(e)}"}, event="error")
+
+    return sse_response(events())
+
+
+
+############ Background jobs #################
+
+async def run_analysis_job(payload: dict) -> dict:
+    result, _, _ = await cached_analysis(ParsedResume(**payload["resume"]), payload["no_cache"])
+    if payload.get("user_id"):  # absent from jobs queued by older versions
+        await remember_analysis(payload["user_id"], result)
+    return result
+
+
+async def run_revision_job(payload: dict) -> str:
+    return await cached_revision(payload["resume_text"], payload["no_cache"])
+
+
+JOB_HANDLERS = {"analyze": run_analysis_job, "revision": run_revision_job}
+
+
+async def submit_job(
+    request: Request, kind: str, user_id: str, resume: ParsedResume, payload: dict, no_cache: bool
+) -> JSONResponse:
+    """Queue a job, or hand back the one already queued/running (or done, unless no_cache) for this
+    user and resume. Handing back an existing job makes no LLM calls, so it is refunded."""
+    key = idempotency_key(kind, user_id, resume.content_hash)
+    job, created = await asyncio.to_thread(jobs.submit, kind, user_id, key, payload, reuse_finished=not no_cache)
+    if created:
+        job_workers.notify()
+    else:
+        admission.record_calls(request, 0)
+    return JSONResponse(status_code=202, content={**job.public(), "reused": not created})
+
+
+@app.post("/jobs/analyze", dependencies=[Depends(admission.limit("analyze", ANALYSIS_CALLS, hold_in_flight=False))])
+async def submit_analysis_job(request: Request, user_id: str = Form(...), file: UploadFile = File(...), no_cache: bool = Form(False)):
+    """Queue an /analyze and return its job id right away; poll /jobs/{job_id} for progress."""
+    file_bytes = await read_resume_upload(file)
+
+    try:
+        resume = await sessions.load(user_id, file_bytes)  # Store resume for chatbot, might raise page len error
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    payload = {"user_id": user_id, "resume": asdict(resume), "no_cache": no_cache}
+    return await submit_job(request, "analyze", user_id, resume, payload, no_cache)
+
+
+@app.post("/jobs/revision", dependencies=[Depends(admission.limit("revision", 1, hold_in_flight=False))])
+async def submit_revision_job(request: Request, user_id: str = Form(...), no_cache: bool = Form(False)):
+    """Queue a /revision and return its job id right away; poll /jobs/{job_id} for progress."""
+    session = await require_session(user_id, "No resume found. Please load it first.")
+    payload = {"resume_text": session.resume.text, "no_cache": no_cache}
+    return await submit_job(request, "revision", user_id, session.resume, payload, no_cache)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found. It may have expired.")
+    return job.public()
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """The finished job's result: the /analyze JSON, or the /revision markdown under "result"."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found. It may have expired.")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}. Try again shortly.")
+    return {"job_id": job.job_id, "kind": job.kind, "result": job.result}
@@ -0,0 +1,195 @@
+# metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Latency buckets in seconds, from PDF parsing (ms) up to slow LLM calls (tens of seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90)
+
+_lock = threading.Lock()
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], None]] = []
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        with _lock:
+            _metrics.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels: Any) -> None:
+        """Copy in a running total that something else counts, e.g. a session store's evictions."""
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}  # per bucket, plus +Inf last
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with _lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def mean(self, **labels: Any) -> Optional[float]:
+        """Average observed value so far, or None before the first observation."""
+        key = self._key(labels)
+        with _lock:
+            count = self._counts.get(key, [0])[-1]
+            return self._sums[key] / count if count else None
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, counts in sorted(self._counts.items()):
+            bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                labels = _format_labels(self.labelnames, key, 'le="' + bound + '"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {self._sums[key]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+def register_collector(collect: Callable[[], None]) -> None:
+    """Run collect() before every scrape, e.g. to copy a store's current size into a Gauge."""
+    with _lock:
+        _collectors.append(collect)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    for collect in list(_collectors):
+        collect()
+    lines = []
+    for metric in list(_metrics):
+        with _lock:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+############ Application metrics #################
+
+REQUEST_SECONDS = Histogram(
+    "resume_assistant_request_seconds", "HTTP request latency until response headers.", ("path", "method", "status")
+)
+STAGE_SECONDS = Histogram(
+    "resume_assistant_stage_seconds", "Latency of one stage of a request (PDF extraction, a named chain, ...).",
+    ("stage",)
+)
+STAGE_ERRORS = Counter("resume_assistant_stage_errors_total", "Stages that raised an error.", ("stage",))
+LLM_SECONDS = Histogram("resume_assistant_llm_seconds", "Latency of one upstream LLM call.", ("task",))
+LLM_ERRORS = Counter("resume_assistant_llm_errors_total", "Upstream LLM calls that failed.", ("task",))
+LLM_TOKENS = Counter(
+    "resume_assistant_llm_tokens_total", "Tokens reported by the upstream LLM.", ("task", "kind")
+)
+SESSIONS = Gauge("resume_assistant_sessions", "Sessions currently stored.")
+SESSION_BYTES = Gauge("resume_assistant_session_bytes", "Bytes of resume text and chat history stored.")
+SESSION_EVICTIONS = Counter(
+    "resume_assistant_session_evictions_total", "Sessions removed, by reason.", ("reason",)
+)
+SESSION_REHYDRATIONS = Counter(
+    "resume_assistant_session_rehydrations_total", "Sessions reloaded from a checkpoint (e.g. after a restart)."
+)
+CACHE_ENTRIES = Gauge("resume_assistant_result_cache_entries", "Results held in the in-memory result cache.")
+CACHE_LOOKUPS = Counter(
+    "resume_assistant_result_cache_lookups_total", "Result cache lookups, by endpoint and outcome.",
+    ("endpoint", "outcome")
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "resume_assistant_admission_rejections_total",
+    "Requests turned away by admission control, by endpoint and reason (rate_limited, overloaded).",
+    ("endpoint", "reason")
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "resume_assistant_admission_wait_seconds", "Time requests waited for room in the in-flight LLM budget."
+)
+ADMISSION_IN_FLIGHT = Gauge("resume_assistant_admission_in_flight", "LLM calls reserved by admitted requests.")
+JOBS = Gauge("resume_assistant_jobs", "Background jobs in the queue, by status.", ("status",))
+LOCAL_CHECK_RESULTS = Counter(
+    "resume_assistant_local_checks_total",
+    "Analysis sections answered by a local check (outcome=local) or handed to the LLM (outcome=llm).",
+    ("section", "outcome")
+)
+LLM_SECONDS_SAVED = Counter(
+    "resume_assistant_llm_seconds_saved_total",
+    "Estimated LLM latency avoided by local checks: the section chain's mean latency minus the local check's.",
+    ("section",)
+)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a stage of request handling into resume_assistant_stage_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
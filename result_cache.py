@@ -0,0 +1,132 @@
+# result_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Optional
+
+from sqlite_store import connect
+
+
+# Outputs are sampled, so caching is opt-in per endpoint, e.g. RESULT_CACHE_ENDPOINTS=analyze,jobmatch
+RESULT_CACHE_ENDPOINTS = os.getenv("RESULT_CACHE_ENDPOINTS", "")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+
+# Optional SQLite file that keeps results across restarts
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "")
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+
+def template_version(*templates: str) -> str:
+    """Fingerprint of the prompt templates, so editing a prompt invalidates its cached results."""
+    digest = hashlib.sha256()
+    for template in templates:
+        digest.update(template.encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def cache_key(endpoint: str, prompt_version: str, resume_text: str, job_description: Optional[str] = None) -> str:
+    parts = [endpoint, prompt_version, hashlib.sha256(resume_text.encode("utf-8")).hexdigest(), job_description]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU cache of LLM results in memory, optionally backed by a SQLite file.
+
+    lookup() and store() are coroutines: the SQLite tier is read and written in a worker thread,
+    under its own lock, so disk I/O neither blocks the event loop nor holds up memory hits.
+    """
+
+    def __init__(self, endpoints: str = RESULT_CACHE_ENDPOINTS, max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 path: str = RESULT_CACHE_PATH, disk_max_entries: int = RESULT_CACHE_DISK_MAX_ENTRIES):
+        self.endpoints = {e.strip() for e in endpoints.split(",") if e.strip()}
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()  # least recently used first
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._lock = threading.Lock()
+
+        self._conn = None
+        self._disk_lock = threading.Lock()
+        if path and self.endpoints:
+            self._conn = connect(path)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at);
+            """)
+
+    def enabled(self, endpoint: str) -> bool:
+        return endpoint in self.endpoints
+
+    async def lookup(self, endpoint: str, key: str, bypass: bool = False) -> Optional[Any]:
+        """Cached result for key, or None on a miss, a bypassed request or a disabled endpoint."""
+        if not self.enabled(endpoint) or bypass:
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits[endpoint] += 1
+                return self._entries[key]
+
+        value = None
+        if self._conn is not None:
+            value = await asyncio.to_thread(self._read, key)
+        with self._lock:
+            if value is None:
+                self._misses[endpoint] += 1
+            else:
+                self._hits[endpoint] += 1
+                self._remember(key, value)
+        return value
+
+    async def store(self, endpoint: str, key: str, value: Any) -> None:
+        if not self.enabled(endpoint):
+            return
+
+        with self._lock:
+            self._remember(key, value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._write, key, json.dumps(value))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": dict(self._hits),
+                "misses": dict(self._misses),
+            }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.close()
+
+    def _remember(self, key: str, value: Any) -> None:
+        # Must hold self._lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[Any]:
+        with self._disk_lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _write(self, key: str, value: str) -> None:
+        with self._disk_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)", (key, value, time.time())
+            )
+            # Everything older than the disk_max_entries newest results
+            self._conn.execute(
+                "DELETE FROM results WHERE stored_at < "
+                "(SELECT stored_at FROM results ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+                (self.disk_max_entries - 1,),
+            )
@@ -0,0 +1,164 @@
+# resume_parser.py
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+try:
+    import resource
+except ImportError:  # not available on Windows; parsing then runs without a memory cap
+    resource = None
+
+
+# Canonical section -> headings that introduce it (compared lowercase, without punctuation)
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me", "about"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "relevant experience", "career history"],
+    "education": ["education", "academic background", "education and training", "academics"],
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "technologies",
+               "tools", "skills and interests", "technical proficiencies"],
+    "projects": ["projects", "personal projects", "selected projects", "academic projects", "key projects"],
+    "other": ["certifications", "certificates", "awards", "honors", "honors and awards", "publications",
+              "volunteer", "volunteer experience", "leadership", "activities", "interests", "languages",
+              "references"],
+}
+_HEADING_TO_SECTION = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# Everything above the first heading is treated as contact details
+CONTACT_SECTION = "contact"
+
+# Lines in the top/bottom margin that repeat on several pages are running headers/footers
+MARGIN_FRACTION = 0.08
+
+_BOLD_FLAG = 16
+
+
+@dataclass
+class _Line:
+    page: int
+    text: str
+    size: float
+    bold: bool
+    in_margin: bool
+
+
+def normalize_whitespace(text: str) -> str:
+    return re.sub(r"\s+", " ", text.replace(" ", " ")).strip()
+
+
+def _heading_key(text: str) -> str:
+    return re.sub(r"[^a-z& ]", "", text.lower()).replace("&", "and").strip()
+
+
+def _repeat_key(text: str) -> str:
+    # Page numbers differ between pages, so "Page 1 of 2" and "Page 2 of 2" count as one line
+    return re.sub(r"\d+", "#", text.lower())
+
+
+def _read_lines(doc: fitz.Document) -> List[_Line]:
+    lines = []
+    for page_number, page in enumerate(doc):
+        height = page.rect.height or 1
+        for block in page.get_text("dict")["blocks"]:
+            if block.get("type") != 0:  # images
+                continue
+            for line in block["lines"]:
+                spans = [span for span in line["spans"] if span["text"].strip()]
+                if not spans:
+                    continue
+                text = normalize_whitespace(" ".join(span["text"] for span in spans))
+                y0, y1 = line["bbox"][1], line["bbox"][3]
+                lines.append(_Line(
+                    page=page_number,
+                    text=text,
+                    size=max(span["size"] for span in spans),
+                    bold=all(span["flags"] & _BOLD_FLAG for span in spans),
+                    in_margin=y1 < height * MARGIN_FRACTION or y0 > height * (1 - MARGIN_FRACTION),
+                ))
+    return lines
+
+
+def _drop_running_headers(lines: List[_Line], page_count: int) -> List[_Line]:
+    if page_count < 2:
+        return lines
+    pages_per_line = Counter()
+    for key, page in {(_repeat_key(line.text), line.page) for line in lines if line.in_margin}:
+        pages_per_line[key] += 1
+    return [line for line in lines if not (line.in_margin and pages_per_line[_repeat_key(line.text)] >= 2)]
+
+
+def _section_for(line: _Line, body_size: float) -> Optional[str]:
+    """Canonical section a line introduces, or None if it is not a heading."""
+    if len(line.text) > 40:
+        return None
+    section = _HEADING_TO_SECTION.get(_heading_key(line.text))
+    if section is None:
+        return None
+    # "Leadership" or "Tools" alone may just be a list item; headings stand out from body text
+    styled = line.bold or line.size > body_size + 0.5 or line.text.isupper() or line.text.endswith(":")
+    return section if styled else None
+
+
+def parse_layout(doc: fitz.Document) -> Dict[str, object]:
+    """Clean text and sections of a resume from PyMuPDF's block/line/span output.
+
+    Whitespace is normalized, running headers/footers repeated across pages are dropped, and lines
+    are grouped under canonical sections (contact, summary, experience, education, skills,
+    projects, other). A repeated heading (e.g. "Experience" again on page 2) continues its section.
+    """
+    lines = _drop_running_headers(_read_lines(doc), doc.page_count)
+    sizes = Counter(round(line.size, 1) for line in lines)
+    body_size = sizes.most_common(1)[0][0] if sizes else 0
+
+    sections: Dict[str, List[str]] = {}
+    current = CONTACT_SECTION
+    for line in lines:
+        section = _section_for(line, body_size)
+        if section is not None:
+            current = section
+            continue
+        sections.setdefault(current, []).append(line.text)
+
+    return {
+        "text": "\n".join(line.text for line in lines),
+        "sections": {name: "\n".join(section_lines) for name, section_lines in sections.items()},
+    }
+
+
+############ Worker entry points #################
+# These run in the PDF parsing worker processes, which is why this module only imports PyMuPDF
+
+def limit_memory(megabytes: int) -> None:
+    """Cap this process's address space. Used as the parsing pool's initializer."""
+    if resource is not None and megabytes > 0:
+        limit = megabytes * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def extract_pdf(file_bytes: bytes, max_pages: int) -> Dict[str, object]:
+    """parse_layout's text and sections, plus page_count and link URIs, for PDF bytes.
+
+    The page limit is checked before any text is extracted. Raises ValueError for files that are
+    unreadable, too long, or too big to parse within the memory cap.
+    """
+    try:
+        doc = fitz.open(stream=file_bytes, filetype="pdf")
+    except RuntimeError:  # fitz.FileDataError and other MuPDF errors
+        raise ValueError("The uploaded file is not a readable PDF.")
+    try:
+        if doc.page_count > max_pages:
+            raise ValueError(f"Your resume exceeds the {max_pages}-page limit. Please upload a shorter version.")
+
+        layout = parse_layout(doc)
+        # Link annotations keep the full URI even when the visible text is just "LinkedIn"
+        links = [link["uri"] for page in doc for link in page.get_links() if link.get("uri")]
+        return {**layout, "page_count": doc.page_count, "links": list(dict.fromkeys(links))}
+    except MemoryError:
+        raise ValueError("Your resume could not be processed. Please upload a simpler PDF.")
+    finally:
+        doc.close()
@@ -0,0 +1,139 @@
+# resume_store.py
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from metrics import span
+from resume_parser import extract_pdf, limit_memory
+
+
+MAX_PAGES = 3
+MAX_UPLOAD_BYTES = 2 * 1024 * 1024
+
+# Every PDF starts with this (some writers put a little junk before it, which readers tolerate)
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+# PDFs are parsed in separate worker processes, so a malformed or hostile file can only take down
+# (and be killed with) its worker: each one gets a memory cap, and a parse gets a time limit
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "2"))
+PDF_PARSE_TIMEOUT = float(os.getenv("PDF_PARSE_TIMEOUT", "10"))
+PDF_PARSE_MEMORY_MB = int(os.getenv("PDF_PARSE_MEMORY_MB", "1024"))
+
+
+@dataclass(frozen=True)
+class ParsedResume:
+    """Text extracted once from an uploaded PDF: sections, link URIs and a few cheap stats."""
+    content_hash: str
+    text: str
+    page_count: int
+    token_estimate: int
+    sections: Dict[str, str] = field(default_factory=dict)
+    links: List[str] = field(default_factory=list)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English prose (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def hash_bytes(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def check_pdf_header(head: bytes) -> None:
+    """Reject uploads that don't start like a PDF, before anything tries to parse them."""
+    if PDF_MAGIC not in head[:PDF_MAGIC_WINDOW]:
+        raise ValueError("The uploaded file is not a valid PDF.")
+
+
+def _to_parsed_resume(extracted: Dict[str, object], file_bytes: bytes, content_hash: Optional[str]) -> ParsedResume:
+    return ParsedResume(
+        content_hash=content_hash or hash_bytes(file_bytes),
+        text=extracted["text"],
+        page_count=extracted["page_count"],
+        token_estimate=estimate_tokens(extracted["text"]),
+        sections=extracted["sections"],
+        links=extracted["links"],
+    )
+
+
+def parse_resume(file_bytes: bytes, content_hash: Optional[str] = None) -> ParsedResume:
+    """Extract cleaned text and sections from uploaded PDF bytes, in this process."""
+    return _to_parsed_resume(extract_pdf(file_bytes, MAX_PAGES), file_bytes, content_hash)
+
+
+############ Parsing workers #################
+
+def _new_parse_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the server process has an event loop and threads that must not be copied.
+    # Workers only import resume_parser (PyMuPDF), so they start quickly.
+    return ProcessPoolExecutor(
+        max_workers=PDF_PARSE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=limit_memory,
+        initargs=(PDF_PARSE_MEMORY_MB,),
+    )
+
+
+_parse_pool = _new_parse_pool()
+_parse_pool_lock = threading.Lock()
+# Pools killed because one PDF timed out; the other parses they were running did nothing wrong
+_timed_out_pools: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+
+def _replace_parse_pool(broken: ProcessPoolExecutor) -> None:
+    """Kill the workers of a pool stuck on (or crashed by) a PDF and start a fresh pool."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not broken:
+            return  # another request already replaced it
+        # The executor has no API to stop a running task, so its processes are terminated directly
+        for process in list((broken._processes or {}).values()):
+            process.terminate()
+        broken.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = _new_parse_pool()
+
+
+async def start_parse_pool() -> None:
+    """Start the parsing workers now instead of on the first upload."""
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(_parse_pool, limit_memory, 0) for _ in range(PDF_PARSE_WORKERS)])
+
+
+def stop_parse_pool() -> None:
+    _parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def parse_resume_async(file_bytes: bytes, content_hash: Optional[str] = None) -> ParsedResume:
+    """parse_resume in a sandboxed worker process, bounded by PDF_PARSE_TIMEOUT, so the event loop
+    keeps serving other requests and a pathological PDF can't stall the server.
+
+    A parse cut short because another upload timed out and took the pool down with it is retried
+    once on the fresh pool."""
+    loop = asyncio.get_running_loop()
+    with span("pdf_extract"):
+        for attempt in range(2):
+            pool = _parse_pool
+            try:
+                extracted = await asyncio.wait_for(
+                    loop.run_in_executor(pool, extract_pdf, file_bytes, MAX_PAGES), PDF_PARSE_TIMEOUT
+                )
+                break
+            except asyncio.TimeoutError:
+                _timed_out_pools.add(pool)
+                _replace_parse_pool(pool)
+                raise ValueError("Your resume took too long to process. Please upload a simpler PDF.")
+            except BrokenProcessPool:
+                _replace_parse_pool(pool)
+                if attempt > 0 or pool not in _timed_out_pools:
+                    raise ValueError("Your resume could not be processed. Please upload a simpler PDF.")
+    return _to_parsed_resume(extracted, file_bytes, content_hash)
@@ -1,22 +1,16 @@
 import os
 import warnings
+from typing import AsyncIterator
 
-# LangChain
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
+from llm_client import LazyChain
+from metrics import span
+from result_cache import template_version
 
 warnings.filterwarnings("ignore")
 
-# Define the GPT Model
-llm_model = "gpt-4o-mini"
-llm = ChatOpenAI(temperature=0.7, model=llm_model)
-
 ################## PROMPT & CHAIN ##################
 
-rewrite_prompt = PromptTemplate(
-    input_variables=["resume"],
-    template="""
+rewrite_prompt = """
 You are an intelligent, helpful resume writing expert. Rewrite the following resume to improve clarity, impact, and professionalism.
 
 Your task:
@@ -41,12 +35,25 @@ Jazz up this resume and get creative!
 
 --- Rewritten Resume in Markdown ---
 """
-)
 
-rewrite_chain = LLMChain(llm=llm, prompt=rewrite_prompt)
+# Shared GPT model and chain, built on first use (model and temperature come from env variables)
+rewrite_chain = LazyChain("revision", rewrite_prompt)
+
+# Changes whenever the prompt is edited; part of the result cache key
+PROMPT_VERSION = template_version(rewrite_prompt)
 
 ################## MAIN FUNCTION ##################
 
-def rewrite_resume(resume_text: str) -> str:
+async def rewrite_resume(resume_text: str) -> str:
     """Run the LangChain rewriting logic on resume text."""
-    return rewrite_chain.run({"resume": resume_text})
+    with span("chain:revision"):
+        outputs = await rewrite_chain.ainvoke({"resume": resume_text})
+    return outputs[rewrite_chain.output_key]
+
+
+async def stream_rewrite(resume_text: str) -> AsyncIterator[str]:
+    """Same rewrite as rewrite_resume, yielded token by token as the model generates it."""
+    chain = rewrite_chain.get()
+    messages = chain.prompt.format_prompt(resume=resume_text).to_messages()
+    async for chunk in chain.llm.astream(messages):
+        yield chunk.content
@@ -0,0 +1,612 @@
+# session_store.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Collection, Dict, List, Optional, Tuple
+
+from resume_store import ParsedResume, hash_bytes, parse_resume_async
+from sqlite_store import SQLiteFile
+
+try:
+    import fcntl
+except ImportError:  # Windows: checkpoint files are then not guarded against sharing
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# "memory" keeps sessions in this process; "sqlite" shares them between workers through a file
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+
+# Total bytes of resume text + chat history kept, and idle seconds before a session expires
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+
+# The memory backend checkpoints every session it stores to this SQLite file (each resume once, then
+# just the conversation) and reloads a session from it on first use after a restart or deploy.
+# "" turns checkpoints off. The sqlite backend keeps sessions on disk already.
+SESSION_CHECKPOINT_PATH = os.getenv("SESSION_CHECKPOINT_PATH", "checkpoints.db")
+
+# How many evicted user ids we remember, so they get "session expired" instead of "not found"
+MAX_TOMBSTONES = 10000
+
+# Version of the compact conversation format (Session.chat_state) used by checkpoints and exports.
+# Format 1 identified the resume by its PDF's hash; 2 by the hash of its text, so a conversation
+# carries over to a re-exported PDF with the same text. Format 1 is still read.
+SESSION_FORMAT = 2
+CHAT_ROLES = ("human", "ai")
+
+
+def compact_messages(history: List[dict]) -> List[List[str]]:
+    """[role, content] pairs from LangChain message dicts, which is all a conversation needs."""
+    return [[message["type"], message["data"]["content"]] for message in history]
+
+
+def expand_messages(messages: List[List[str]]) -> List[dict]:
+    """LangChain message dicts (as messages_from_dict reads them) from [role, content] pairs."""
+    for message in messages:
+        if not (isinstance(message, list) and len(message) == 2 and message[0] in CHAT_ROLES
+                and isinstance(message[1], str)):
+            raise ValueError("The conversation history is malformed.")
+    return [{"type": role, "data": {"type": role, "content": content}} for role, content in messages]
+
+
+@dataclass
+class Session:
+    """Everything we keep for one user: their parsed resume, serialized chat history, the
+    rolling summary of older turns, and the last analysis of this resume (with the prompt
+    version that produced it) for incremental re-analysis.
+
+    An output reused from an earlier upload was computed from that upload's resume:
+    analysis_sources maps each output to the content hash of the resume it came from, and
+    analysis_bases holds the text and sections of those other than the current resume."""
+    user_id: str
+    resume: ParsedResume
+    history: List[dict] = field(default_factory=list)
+    summary: str = ""
+    analysis: Dict[str, str] = field(default_factory=dict)
+    analysis_version: str = ""
+    analysis_sources: Dict[str, str] = field(default_factory=dict)
+    analysis_bases: Dict[str, dict] = field(default_factory=dict)
+    last_access: float = field(default_factory=time.time)
+
+    def size_bytes(self) -> int:
+        resume_bytes = len(self.resume.text.encode("utf-8")) + len(json.dumps(self.resume.sections))
+        chat_bytes = len(json.dumps(self.history)) + len(self.summary.encode("utf-8"))
+        analysis_bytes = len(json.dumps(self.analysis)) + len(json.dumps(self.analysis_bases))
+        return resume_bytes + chat_bytes + analysis_bytes
+
+    def analysis_base(self, key: str) -> Tuple[str, Dict[str, str]]:
+        """The resume text and sections the stored analysis output `key` was computed from."""
+        base = self.analysis_bases.get(self.analysis_sources.get(key, self.resume.content_hash))
+        if base is None:
+            return self.resume.text, self.resume.sections
+        return base["text"], base["sections"]
+
+    def remember_analysis(
+        self, outputs: Dict[str, str], version: str, previous: Optional["Session"] = None, reused: Collection[str] = ()
+    ) -> None:
+        """Keep an analysis of this resume. Outputs in `reused` were carried over from `previous`'s
+        analysis and keep pointing at the resume they were computed from."""
+        sources, bases = {}, {}
+        for key in outputs:
+            if previous is None or key not in reused:
+                sources[key] = self.resume.content_hash
+                continue
+            sources[key] = previous.analysis_sources.get(key, previous.resume.content_hash)
+            if sources[key] != self.resume.content_hash and sources[key] not in bases:
+                text, sections = previous.analysis_base(key)
+                bases[sources[key]] = {"text": text, "sections": sections}
+        self.analysis = dict(outputs)
+        self.analysis_version = version
+        self.analysis_sources = sources
+        self.analysis_bases = bases
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "user_id": self.user_id,
+            "resume": asdict(self.resume),
+            "history": self.history,
+            "summary": self.summary,
+            "analysis": self.analysis,
+            "analysis_version": self.analysis_version,
+            "analysis_sources": self.analysis_sources,
+            "analysis_bases": self.analysis_bases,
+        })
+
+    def chat_state(self) -> dict:
+        """The conversation in compact form: which resume it is about (by the hash of its text), the
+        recent turns and the summary of older ones."""
+        return {
+            "format": SESSION_FORMAT,
+            "resume_hash": hash_bytes(self.resume.text.encode("utf-8")),
+            "history": compact_messages(self.history),
+            "summary": self.summary,
+        }
+
+    def restore_chat(self, state: dict) -> None:
+        """Replace the conversation with one from chat_state(), which must be about the same resume."""
+        if not isinstance(state, dict) or state.get("format") not in (1, SESSION_FORMAT):
+            raise ValueError("Unsupported session format.")
+        if state["format"] == 1:
+            resume_hash = self.resume.content_hash
+        else:
+            resume_hash = hash_bytes(self.resume.text.encode("utf-8"))
+        if state.get("resume_hash") != resume_hash:
+            raise ValueError("This conversation is about a different resume. Please load that resume first.")
+        summary = state.get("summary", "")
+        if not isinstance(summary, str) or not isinstance(state.get("history"), list):
+            raise ValueError("The conversation history is malformed.")
+        self.history = expand_messages(state["history"])
+        self.summary = summary
+
+    @classmethod
+    def from_json(cls, payload: str, last_access: float) -> "Session":
+        data = json.loads(payload)
+        return cls(
+            user_id=data["user_id"],
+            resume=ParsedResume(**data["resume"]),
+            history=data["history"],
+            summary=data.get("summary", ""),
+            analysis=data.get("analysis", {}),
+            analysis_version=data.get("analysis_version", ""),
+            analysis_sources=data.get("analysis_sources", {}),
+            analysis_bases=data.get("analysis_bases", {}),
+            last_access=last_access,
+        )
+
+
+class SessionStore(ABC):
+    """Per-user sessions. Subclasses decide where they live and how they are evicted.
+
+    Backends may block on disk (checkpoints, the sqlite file), so async code calls them
+    through asyncio.to_thread.
+    """
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[Session]:
+        ...
+
+    @abstractmethod
+    def put(self, session: Session) -> None:
+        """Insert or update a session, evicting others if over budget."""
+
+    @abstractmethod
+    def was_evicted(self, user_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    def close(self) -> None:
+        pass
+
+    async def load(self, user_id: str, file_bytes: bytes) -> ParsedResume:
+        """Parse and store a user's resume. Re-uploading the same file keeps the existing session."""
+        content_hash = hash_bytes(file_bytes)
+        session = await asyncio.to_thread(self.get, user_id)
+        if session is not None and session.resume.content_hash == content_hash:
+            return session.resume
+
+        resume = await parse_resume_async(file_bytes, content_hash)  # might raise page len error
+        await asyncio.to_thread(self.put, Session(user_id=user_id, resume=resume))
+        return resume
+
+
+############ Checkpoints #################
+
+class CheckpointsInUse(Exception):
+    """Another process has the checkpoint file open."""
+
+
+class SessionCheckpoints(SQLiteFile):
+    """Compact copies of sessions in a local SQLite file, so they outlive the process.
+
+    Each parsed resume is written once, under its content hash. Per user only chat_state() is
+    written, so checkpointing after every chat turn stays small. save() and delete() only queue
+    the change; a background thread writes queued changes in one transaction, so callers never
+    wait on the disk. Only a user's latest change is kept while it waits, and close() writes
+    whatever is left.
+
+    The file belongs to one process at a time (CheckpointsInUse otherwise): each memory-backend
+    worker has its own copy of a session, and several writing one file would overwrite each
+    other's turns.
+    """
+
+    # Expired checkpoints and unreferenced resumes are cleared at most this often
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path: str = SESSION_CHECKPOINT_PATH, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._next_purge = 0.0
+        self._owner = open(path + ".lock", "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._owner.close()
+                raise CheckpointsInUse(path)
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS resumes (content_hash TEXT PRIMARY KEY, payload TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS chats (
+                user_id TEXT PRIMARY KEY,
+                resume_hash TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chats_updated_at ON chats (updated_at);
+            CREATE INDEX IF NOT EXISTS chats_resume_hash ON chats (resume_hash);
+        """)
+        # user_id -> (resume, chat_state JSON) to write, or None to delete
+        self._pending: Dict[str, Optional[Tuple[ParsedResume, str]]] = {}
+        self._pending_changed = threading.Condition()
+        self._closing = False
+        self._writer = threading.Thread(target=self._write_pending, name="session-checkpoints", daemon=True)
+        self._writer.start()
+
+    def save(self, session: Session) -> None:
+        self._queue(session.user_id, (session.resume, json.dumps(session.chat_state())))
+
+    def delete(self, user_id: str) -> None:
+        self._queue(user_id, None)
+
+    def load(self, user_id: str) -> Optional[Session]:
+        """The user's checkpointed session, unless there is none or it has been idle past the TTL."""
+        with self._pending_changed:
+            if user_id in self._pending:
+                change = self._pending[user_id]
+                return self._session(user_id, *change) if change is not None else None
+        # A change the writer already took is committed before this read gets the lock
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chats.state, resumes.payload FROM chats JOIN resumes ON resumes.content_hash = chats.resume_hash "
+                "WHERE chats.user_id = ? AND chats.updated_at >= ?", (user_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+        return self._session(user_id, ParsedResume(**json.loads(row[1])), row[0])
+
+    def close(self) -> None:
+        with self._pending_changed:
+            self._closing = True
+            self._pending_changed.notify()
+        self._writer.join()
+        super().close()
+        self._owner.close()  # releases the file to the next process
+
+    @staticmethod
+    def _session(user_id: str, resume: ParsedResume, state: str) -> Session:
+        session = Session(user_id=user_id, resume=resume)
+        session.restore_chat(json.loads(state))
+        return session
+
+    def _queue(self, user_id: str, change: Optional[Tuple[ParsedResume, str]]) -> None:
+        with self._pending_changed:
+            self._pending[user_id] = change
+            self._pending_changed.notify()
+
+    def _write_pending(self) -> None:
+        while True:
+            with self._pending_changed:
+                while not self._pending and not self._closing:
+                    self._pending_changed.wait()
+                if not self._pending:
+                    return
+            changes = {}
+            try:
+                with self._transaction():
+                    with self._pending_changed:
+                        changes, self._pending = self._pending, {}
+                    self._write(changes, time.time())
+            except Exception:
+                logger.exception("Writing %d session checkpoints failed", len(changes))
+
+    def _write(self, changes: Dict[str, Optional[Tuple[ParsedResume, str]]], now: float) -> None:
+        # Must be inside self._transaction()
+        for user_id, change in changes.items():
+            if change is None:
+                self._conn.execute("DELETE FROM chats WHERE user_id = ?", (user_id,))
+                continue
+            resume, state = change
+            self._conn.execute(
+                "INSERT OR IGNORE INTO resumes (content_hash, payload) VALUES (?, ?)",
+                (resume.content_hash, json.dumps(asdict(resume))),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chats (user_id, resume_hash, state, updated_at) VALUES (?, ?, ?, ?)",
+                (user_id, resume.content_hash, state, now),
+            )
+        if now >= self._next_purge:
+            self._purge(now)
+            self._next_purge = now + self.PURGE_INTERVAL
+
+    def _purge(self, now: float) -> None:
+        # Must be inside self._transaction()
+        self._conn.execute("DELETE FROM chats WHERE updated_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute("DELETE FROM resumes WHERE content_hash NOT IN (SELECT resume_hash FROM chats)")
+
+
+############ In-memory backend #################
+
+class MemorySessionStore(SessionStore):
+    """Sessions in this process's RAM, with a byte budget, LRU eviction and an idle TTL.
+
+    With `checkpoints`, every stored session is also checkpointed, and a session missing from RAM
+    (e.g. after a restart) is reloaded from its checkpoint on first use. Evicted and expired
+    sessions lose their checkpoint too.
+    """
+
+    def __init__(self, max_bytes: int = SESSION_MAX_BYTES, ttl_seconds: float = SESSION_TTL_SECONDS,
+                 checkpoints: Optional[SessionCheckpoints] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.checkpoints = checkpoints
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()  # least recently used first
+        self._sizes: Dict[str, int] = {}
+        self._tombstones: "OrderedDict[str, None]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rehydrations = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Session]:
+        with self._lock:
+            self._expire(time.time())
+            session = self._sessions.get(user_id)
+            if session is not None:
+                session.last_access = time.time()
+                self._sessions.move_to_end(user_id)
+                return session
+            if self.checkpoints is None or user_id in self._tombstones:
+                return None
+
+        # Read the checkpoint without holding up other users' requests
+        session = self.checkpoints.load(user_id)
+        if session is None:
+            return None
+        with self._lock:
+            if user_id in self._sessions:  # stored (or rehydrated) meanwhile
+                return self._sessions[user_id]
+            if user_id in self._tombstones:
+                return None
+            self._add(session)
+            self._rehydrations += 1
+        return session
+
+    def put(self, session: Session) -> None:
+        with self._lock:
+            self._tombstones.pop(session.user_id, None)
+            self._add(session)
+        if self.checkpoints is not None:
+            self.checkpoints.save(session)
+
+    def was_evicted(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._tombstones
+
+    def close(self) -> None:
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._sessions),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "rehydrations": self._rehydrations,
+            }
+
+    # Callers below must hold self._lock
+
+    def _add(self, session: Session) -> None:
+        self._drop(session.user_id)
+        session.last_access = time.time()
+        size = session.size_bytes()
+        self._sessions[session.user_id] = session
+        self._sizes[session.user_id] = size
+        self._bytes += size
+
+        self._expire(session.last_access)
+        # Never evict the session we were just handed, even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            self._evict(oldest)
+            self._evictions += 1
+
+    def _expire(self, now: float) -> None:
+        # Sessions are ordered by last access, so expired ones are always at the front
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_access <= self.ttl_seconds:
+                break
+            self._evict(oldest_id)
+            self._expirations += 1
+
+    def _evict(self, user_id: str) -> None:
+        self._drop(user_id)
+        if self.checkpoints is not None:
+            self.checkpoints.delete(user_id)
+        self._tombstones[user_id] = None
+        if len(self._tombstones) > MAX_TOMBSTONES:
+            self._tombstones.popitem(last=False)
+
+    def _drop(self, user_id: str) -> None:
+        if self._sessions.pop(user_id, None) is not None:
+            self._bytes -= self._sizes.pop(user_id)
+
+
+############ SQLite backend #################
+
+class SQLiteSessionStore(SQLiteFile, SessionStore):
+    """Sessions in a SQLite file, so every worker (or node, on a shared volume) sees the same data.
+
+    Budget and TTL rules match MemorySessionStore, with last access times in wall-clock seconds.
+    Reads don't write: a session's last access is only recorded once it is TOUCH_INTERVAL old,
+    and recorded accesses are written together with the next put() or batch of them, so the
+    stored time lags the real one by at most about twice TOUCH_INTERVAL. The total size is kept
+    in the counters table rather than summed on every write.
+    """
+
+    TOUCH_INTERVAL = 30
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, max_bytes: int = SESSION_MAX_BYTES,
+                 ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._touched: Dict[str, float] = {}  # user_id -> last access not written yet
+        self._next_touch_flush = 0.0
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+            CREATE TABLE IF NOT EXISTS tombstones (user_id TEXT PRIMARY KEY, evicted_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        with self._transaction():
+            # Files written before the running total was kept
+            self._conn.execute(
+                "INSERT OR IGNORE INTO counters (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM sessions"
+            )
+
+    def get(self, user_id: str) -> Optional[Session]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, last_access FROM sessions WHERE user_id = ? AND last_access >= ?",
+                (user_id, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - max(row[1], self._touched.get(user_id, 0)) >= self.TOUCH_INTERVAL:
+                self._touched[user_id] = now
+            flush = bool(self._touched) and now >= self._next_touch_flush
+        if flush:
+            with self._transaction():
+                self._flush_touched(now)
+        return Session.from_json(row[0], now)
+
+    def put(self, session: Session) -> None:
+        session.last_access = time.time()
+        size = session.size_bytes()
+        with self._transaction():
+            self._flush_touched(session.last_access)
+            row = self._conn.execute("SELECT size FROM sessions WHERE user_id = ?", (session.user_id,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                (session.user_id, session.to_json(), size, session.last_access),
+            )
+            self._conn.execute("DELETE FROM tombstones WHERE user_id = ?", (session.user_id,))
+            self._bump("bytes", size - (row[0] if row is not None else 0))
+            self._expire(session.last_access)
+
+            total = self._counter("bytes")
+            if total <= self.max_bytes:
+                return
+            # Never evict the session we were just handed, even if it alone exceeds the budget
+            victims = []
+            for user_id, victim_size in self._conn.execute(
+                "SELECT user_id, size FROM sessions WHERE user_id != ? ORDER BY last_access", (session.user_id,)
+            ):
+                if total <= self.max_bytes:
+                    break
+                victims.append((user_id, victim_size))
+                total -= victim_size
+            self._evict(victims, session.last_access)
+            self._bump("evictions", len(victims))
+
+    def was_evicted(self, user_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tombstones WHERE user_id = ? "
+                "UNION ALL SELECT 1 FROM sessions WHERE user_id = ? AND last_access < ?",
+                (user_id, user_id, time.time() - self.ttl_seconds),
+            ).fetchone()
+        return row is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+        return {
+            "entries": entries,
+            "bytes": counters.get("bytes", 0),
+            "max_bytes": self.max_bytes,
+            "evictions": counters.get("evictions", 0),
+            "expirations": counters.get("expirations", 0),
+        }
+
+    # Callers below must be inside self._transaction()
+
+    def _flush_touched(self, now: float) -> None:
+        touched, self._touched = self._touched, {}
+        self._next_touch_flush = now + self.TOUCH_INTERVAL
+        self._conn.executemany(
+            "UPDATE sessions SET last_access = MAX(last_access, ?) WHERE user_id = ?",
+            [(last_access, user_id) for user_id, last_access in touched.items()],
+        )
+
+    def _expire(self, now: float) -> None:
+        expired = self._conn.execute(
+            "SELECT user_id, size FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,)
+        ).fetchall()
+        self._evict(expired, now)
+        self._bump("expirations", len(expired))
+
+    def _evict(self, victims: List[Tuple[str, int]], now: float) -> None:
+        if not victims:
+            return
+        self._conn.executemany("DELETE FROM sessions WHERE user_id = ?", [(u,) for u, _ in victims])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO tombstones (user_id, evicted_at) VALUES (?, ?)", [(u, now) for u, _ in victims]
+        )
+        self._conn.execute(
+            "DELETE FROM tombstones WHERE user_id NOT IN "
+            "(SELECT user_id FROM tombstones ORDER BY evicted_at DESC LIMIT ?)", (MAX_TOMBSTONES,)
+        )
+        self._bump("bytes", -sum(size for _, size in victims))
+
+    def _counter(self, name: str) -> int:
+        row = self._conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def _bump(self, name: str, amount: int) -> None:
+        if amount:
+            self._conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount)
+            )
+
+
+def create_session_store() -> SessionStore:
+    """Build the session backend selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "memory":
+        checkpoints = None
+        if SESSION_CHECKPOINT_PATH:
+            try:
+                checkpoints = SessionCheckpoints()
+            except CheckpointsInUse:
+                logger.warning(
+                    "%s is used by another worker; sessions in this one won't be checkpointed. "
+                    "Use SESSION_BACKEND=sqlite to share sessions between workers.", SESSION_CHECKPOINT_PATH
+                )
+        return MemorySessionStore(checkpoints=checkpoints)
+    if SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {SESSION_BACKEND!r}")
@@ -0,0 +1,41 @@
+# sqlite_store.py
+# Shared plumbing for the state kept in SQLite files (sessions, checkpoints, jobs, admission, cache).
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """A connection in autocommit mode (transactions are explicit), usable from any thread, with
+    write-ahead logging so readers in other processes don't block writers."""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class SQLiteFile:
+    """Base for classes keeping their state in one SQLite file, shared by the threads of this
+    process and by other processes. `schema` is run on open and must be idempotent."""
+
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(schema)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Serialize access within this process and hold the file's write lock across processes."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
@@ -0,0 +1,138 @@
+# conftest.py
+
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import pytest
+import requests
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app's modules live at the repository root
+sys.path.insert(0, REPO)
+
+
+############ Server processes #################
+# Tests that need the whole app run it with uvicorn against fake_llm.py, like benchmark.py does
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"{url} did not become ready within {timeout:g}s")
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+@pytest.fixture
+def fake_llm(tmp_path) -> Callable[..., str]:
+    """Start fake_llm.py with the given options (e.g. latency=0.2) and return its base URL."""
+    processes: List[subprocess.Popen] = []
+
+    def start(latency: float = 0.05, tokens_per_second: float = 0, completion_tokens: int = 30) -> str:
+        port = free_port()
+        log = open(tmp_path / f"fake_llm_{port}.log", "w")
+        process = subprocess.Popen([
+            sys.executable, "fake_llm.py", "--port", str(port), "--latency", str(latency), "--jitter", "0",
+            "--tokens-per-second", str(tokens_per_second), "--completion-tokens", str(completion_tokens),
+            "--seed", "1",
+        ], cwd=REPO, stdout=log, stderr=subprocess.STDOUT)
+        processes.append(process)
+        url = f"http://127.0.0.1:{port}"
+        wait_until_ready(f"{url}/stats", process)
+        return url
+
+    yield start
+    for process in processes:
+        stop_process(process)
+
+
+class App:
+    """One uvicorn process serving main:app."""
+
+    def __init__(self, env: Dict[str, str], workdir: str):
+        self.env = env
+        self.workdir = workdir
+        self.process = None
+        self.url = ""
+
+    def start(self) -> "App":
+        port = free_port()
+        log = open(os.path.join(self.workdir, f"app_{port}.log"), "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=REPO, env=self.env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        self.url = f"http://127.0.0.1:{port}"
+        wait_until_ready(f"{self.url}/health", self.process)
+        return self
+
+    def stop(self) -> None:
+        if self.process is not None:
+            stop_process(self.process)
+            self.process = None
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return requests.post(self.url + path, timeout=60, **kwargs)
+
+
+@pytest.fixture
+def start_app(tmp_path) -> Callable[..., App]:
+    """Start the app against a fake LLM URL, with extra settings as keyword arguments. Each app keeps
+    its state files in its own directory unless the settings point them elsewhere."""
+    apps: List[App] = []
+
+    def start(llm_url: str, **settings: str) -> App:
+        workdir = tmp_path / f"app{len(apps)}"
+        workdir.mkdir()
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "fake",
+            "OPENAI_API_BASE": f"{llm_url}/v1",
+            "RATE_LIMIT_CALLS_PER_MINUTE": "0",
+            "SESSION_SQLITE_PATH": str(workdir / "sessions.db"),
+            "SESSION_CHECKPOINT_PATH": str(workdir / "checkpoints.db"),
+            "JOB_QUEUE_PATH": str(workdir / "jobs.db"),
+            "ADMISSION_SQLITE_PATH": str(workdir / "admission.db"),
+            **settings,
+        }
+        app = App(env, str(workdir))
+        apps.append(app)
+        return app.start()
+
+    yield start
+    for app in apps:
+        app.stop()
+
+
+@pytest.fixture(scope="session")
+def resume_pdf() -> bytes:
+    from benchmark import sample_resume_pdf
+
+    return sample_resume_pdf(random.Random(7))
@@ -0,0 +1,80 @@
+# test_admission.py
+
+from typing import List
+
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from admission import Admission, MemoryLimiterState
+
+
+def make_client() -> TestClient:
+    # 60 calls per minute, so a test's refill is negligible next to the cost
+    admission = Admission(MemoryLimiterState(), calls_per_minute=60, burst=8, max_in_flight=8)
+    app = FastAPI()
+
+    @app.post("/analyze", dependencies=[Depends(admission.limit("analyze", 8))])
+    async def analyze(request: Request, user_id: str = Form(...), file: UploadFile = File(...),
+                      cached: bool = Form(False)):
+        if not file.filename.endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+        admission.record_calls(request, 0 if cached else 8)
+        return {"ok": True}
+
+    @app.post("/analyze/stream", dependencies=[Depends(admission.limit("analyze", 8))])
+    async def analyze_stream(request: Request, user_id: str = Form(...), cached: bool = Form(False)):
+        async def events():
+            admission.record_calls(request, 0 if cached else 8)
+            yield "done"
+
+        return StreamingResponse(events())
+
+    def batch_cost(form) -> int:
+        if len(form.getlist("items")) > 4:
+            raise HTTPException(status_code=400, detail="Too many items.")
+        return 2 * len(form.getlist("items"))
+
+    @app.post("/batch", dependencies=[Depends(admission.limit("batch", batch_cost))])
+    async def batch(user_id: str = Form(...), items: List[str] = Form(...)):
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def post(client: TestClient, filename: str = "resume.pdf", **fields):
+    return client.post("/analyze", data={"user_id": "jane", **fields}, files={"file": (filename, b"%PDF-1.4")})
+
+
+def test_rejected_upload_is_refunded():
+    client = make_client()
+    assert post(client, "resume.txt").status_code == 400
+    assert post(client).status_code == 200
+    assert post(client).status_code == 429
+
+
+def test_invalid_form_is_refunded():
+    client = make_client()
+    assert client.post("/analyze", data={"user_id": "jane"}).status_code == 422
+    assert post(client).status_code == 200
+
+
+def test_unused_calls_are_refunded():
+    client = make_client()
+    assert post(client, cached="true").status_code == 200
+    assert post(client).status_code == 200
+    assert post(client).status_code == 429
+
+
+def test_calls_recorded_while_streaming_are_settled_after_the_stream():
+    client = make_client()
+    response = client.post("/analyze/stream", data={"user_id": "jane", "cached": "true"})
+    assert response.text == "done"
+    assert post(client).status_code == 200
+    assert post(client).status_code == 429
+
+
+def test_oversized_batch_is_turned_away_before_it_is_charged():
+    client = make_client()
+    assert client.post("/batch", data={"user_id": "jane", "items": ["a"] * 100}).status_code == 400
+    assert client.post("/batch", data={"user_id": "jane", "items": ["a"] * 4}).status_code == 200
@@ -0,0 +1,81 @@
+# test_chatbot.py
+
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import chatbot
+from resume_store import ParsedResume
+from session_store import Session
+
+TURNS = 100
+REPLY = "Try leading each bullet with the result, then the action and the tools you used. " * 4
+
+
+def make_session() -> Session:
+    resume = ParsedResume(content_hash="hash", text="Jane Doe, data analyst.", page_count=1, token_estimate=6)
+    return Session(user_id="alice", resume=resume)
+
+
+@pytest.fixture
+def session(monkeypatch) -> Session:
+    monkeypatch.setattr(chatbot, "CHAT_MEMORY_MODE", "summary")
+    monkeypatch.setattr(chatbot, "CHAT_MEMORY_TURNS", 1)
+    monkeypatch.setattr(chatbot, "get_llm", lambda task: FakeListChatModel(responses=["Sure."]))
+    return make_session()
+
+
+async def converse(session: Session, turns: int) -> list:
+    """Prompt tokens of each turn, compacting after every reply like the chat endpoints do."""
+    tokens = []
+    for turn in range(turns):
+        reply = await chatbot.chat_reply(session, f"Question {turn}: how do I make my experience section stronger?")
+        tokens.append(reply["prompt_tokens"])
+        await chatbot.compact_history(session)
+    return tokens
+
+
+def test_failed_summarizer_keeps_the_turn_and_the_history(monkeypatch, session):
+    async def failing_summarizer(inputs):
+        raise RuntimeError("summarizer is down")
+
+    monkeypatch.setattr(chatbot.summarize_chain, "ainvoke", failing_summarizer)
+    asyncio.run(converse(session, 3))
+    assert len(session.history) == 6
+    assert session.summary == ""
+
+    async def summarizer(inputs):
+        return {"text": "They asked three questions."}
+
+    monkeypatch.setattr(chatbot.summarize_chain, "ainvoke", summarizer)
+    asyncio.run(converse(session, 1))
+    assert session.summary == "They asked three questions."
+    assert len(session.history) == 2
+
+
+@pytest.mark.parametrize("mode", ["buffer", "window", "summary"])
+def test_prompt_size_over_a_long_conversation(monkeypatch, mode):
+    summaries = []
+
+    async def summarizer(inputs):
+        summaries.append(inputs)
+        return {"text": "The applicant is reworking their experience section, one bullet at a time. " * 3}
+
+    monkeypatch.setattr(chatbot, "CHAT_MEMORY_MODE", mode)
+    monkeypatch.setattr(chatbot, "CHAT_MEMORY_TURNS", 8)
+    monkeypatch.setattr(chatbot, "get_llm", lambda task: FakeListChatModel(responses=[REPLY]))
+    monkeypatch.setattr(chatbot.summarize_chain, "ainvoke", summarizer)
+
+    tokens = asyncio.run(converse(make_session(), TURNS))
+
+    if mode == "buffer":
+        # Every turn resends everything before it
+        assert all(later > earlier for earlier, later in zip(tokens, tokens[1:]))
+        assert tokens[-1] > 20 * tokens[0]
+        return
+    # Bounded: once compaction kicks in, the prompt stops growing with the conversation
+    assert max(tokens[10:]) < 1.2 * max(tokens[:10])
+    assert max(tokens[-50:]) <= max(tokens[10:50])
+    # The summarizer runs every few turns, not every turn
+    assert (len(summaries) == 0) if mode == "window" else (0 < len(summaries) <= TURNS / 4)
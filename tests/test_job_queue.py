@@ -0,0 +1,39 @@
+# test_job_queue.py
+
+from unittest import mock
+
+from job_queue import FAILED, QUEUED, JobQueue
+
+
+def make_queue(tmp_path, **settings) -> JobQueue:
+    return JobQueue(str(tmp_path / "jobs.db"), max_attempts=3, retry_backoff_seconds=10, **settings)
+
+
+def test_failed_job_waits_out_a_growing_backoff(tmp_path):
+    queue = make_queue(tmp_path)
+    job, _ = queue.submit("analyze", "user-1", "key", {})
+    now = 1000.0
+    with mock.patch("job_queue.time.time", lambda: now):
+        assert queue.claim().job_id == job.job_id
+        queue.fail(job.job_id, "upstream error")
+        assert queue.get(job.job_id).status == QUEUED
+        assert queue.claim() is None
+
+        now += 10
+        assert queue.claim().attempts == 2
+        queue.fail(job.job_id, "upstream error")
+        now += 10
+        assert queue.claim() is None  # second retry waits 20s
+        now += 10
+        assert queue.claim().attempts == 3
+
+        queue.fail(job.job_id, "upstream error")
+        assert queue.get(job.job_id).status == FAILED
+        now += 1000
+        assert queue.claim() is None
+
+
+def test_idle_claim_does_not_take_the_write_lock(tmp_path):
+    queue = make_queue(tmp_path)
+    with mock.patch.object(queue, "_transaction", side_effect=AssertionError("write lock taken")):
+        assert queue.claim() is None
@@ -0,0 +1,57 @@
+# test_job_rank.py
+
+from unittest import mock
+
+import job_rank
+from job_match import prerank_job_descriptions
+from job_rank import JobIndex
+
+
+RESUME = "Python developer with Django, PostgreSQL and AWS experience building REST APIs."
+
+
+def posting(index: int) -> str:
+    return f"Posting {index}: backend engineer, Python and Django, team {index}."
+
+
+def test_batch_that_overflows_the_index_ranks_every_posting():
+    index = JobIndex(max_postings=10)
+    first = index.rank_texts(RESUME, [posting(i) for i in range(8)])
+    assert len(first) == 8
+
+    # The second batch doesn't fit next to the first, so the index starts a new generation
+    second = index.rank_texts(RESUME, [posting(i) for i in range(8, 14)])
+    assert len(second) == 6
+    assert index.generation == 1
+    assert len(index) == 6
+    assert all(result.score > 0 for result in second)
+
+
+def test_ids_from_before_a_clear_are_added_again():
+    index = JobIndex(max_postings=10)
+    index.add_many([posting(i) for i in range(8)])
+    _, generation = index.add_many([posting(i) for i in range(8, 14)])
+    assert generation == 1
+
+    # Postings from the first generation are re-indexed rather than pointing past the end
+    results = index.rank_texts(RESUME, [posting(0), posting(9)])
+    assert [result.posting_id for result in results] == [6, 1]
+
+
+def test_prerank_keeps_request_order_across_wraparound():
+    with mock.patch("job_match.JOB_INDEX", JobIndex(max_postings=10)):
+        prerank_job_descriptions(RESUME, [posting(i) for i in range(8)])
+        ranked = prerank_job_descriptions(RESUME, [posting(i) for i in range(8, 14)] + ["Registered nurse, ICU."])
+    assert sorted(item["index"] for item in ranked) == list(range(7))
+    assert ranked[-1]["index"] == 6
+
+
+def test_known_postings_are_not_vectorized_again():
+    index = JobIndex()
+    texts = [posting(i) for i in range(20)]
+    index.add_many(texts)
+    with mock.patch.object(job_rank, "vectorize", wraps=job_rank.vectorize) as vectorize:
+        index.add_many(texts)
+        index.rank_texts(RESUME, texts)
+    # Only the resume is vectorized
+    assert vectorize.call_count == 1
@@ -0,0 +1,41 @@
+# test_local_checks.py
+
+import pytest
+
+from local_checks import extract_contact, local_personal_info
+
+
+@pytest.mark.parametrize("text, location", [
+    ("Jane Doe\njane@example.com | (555) 123-4567\nBoston, MA", "Boston, MA"),
+    ("Jane Doe\njane@example.com\nToronto, Ontario", "Toronto, Ontario"),
+    ("Jane Doe\njane@example.com\nBerlin, Germany", "Berlin, Germany"),
+    # Unknown region, but on the same line as the email
+    ("Jane Doe\nSpringfield, Freedonia | jane@example.com", "Springfield, Freedonia"),
+    # A job title and employer is not a location
+    ("Jane Doe\nData Scientist, Spotify\njane@example.com", ""),
+    ("Jane Doe\njane@example.com\nAcme Corp, Globex", ""),
+    ("Jane Doe\nSenior Engineer, Boston | jane@example.com", ""),
+])
+def test_location(text, location):
+    assert extract_contact(text)["location"] == location
+
+
+@pytest.mark.parametrize("text, name", [
+    ("Jane Doe\njane@example.com", "Jane Doe"),
+    ("Curriculum Vitae\nJane Doe\njane@example.com", "Jane Doe"),
+    ("Professional Summary\nJane Doe", "Jane Doe"),
+    ("Software Engineer\nJane Doe", "Jane Doe"),
+    ("Curriculum Vitae\njane@example.com", ""),
+    ("Work Experience\nData Analyst", ""),
+])
+def test_name(text, name):
+    assert extract_contact(text)["name"] == name
+
+
+def test_defers_to_llm_when_unsure():
+    assert local_personal_info("Curriculum Vitae\nData Scientist, Spotify\njane@example.com") is None
+    assert local_personal_info("Jane Doe\nData Scientist, Spotify\njane@example.com") is None
+
+    info = local_personal_info("Jane Doe\njane@example.com | (555) 123-4567 | Boston, MA")
+    assert "**Name:** Jane Doe" in info
+    assert "**Location:** Boston, MA" in info
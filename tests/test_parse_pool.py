@@ -0,0 +1,42 @@
+# test_parse_pool.py
+
+import asyncio
+import os
+import time
+
+import pytest
+
+import resume_store
+
+
+def stuck_or_once(file_bytes: bytes, max_pages: int) -> dict:
+    """Runs in a parsing worker. b"stuck" never finishes; b"once:<path>" hangs on its first run only."""
+    if file_bytes.startswith(b"once:"):
+        marker = file_bytes[len(b"once:"):].decode()
+        if os.path.exists(marker):
+            return {"text": "Jane Doe", "sections": {}, "page_count": 1, "links": []}
+        open(marker, "w").close()
+    time.sleep(60)
+
+
+@pytest.fixture
+def parse_pool(monkeypatch):
+    monkeypatch.setattr(resume_store, "extract_pdf", stuck_or_once)
+    monkeypatch.setattr(resume_store, "PDF_PARSE_TIMEOUT", 3)
+    monkeypatch.setattr(resume_store, "_parse_pool", resume_store._new_parse_pool())
+    asyncio.run(resume_store.start_parse_pool())
+    yield
+    resume_store.stop_parse_pool()
+
+
+def test_parse_killed_by_another_uploads_timeout_is_retried(parse_pool, tmp_path):
+    async def innocent():
+        await asyncio.sleep(1)  # still running when the stuck parse times out
+        return await resume_store.parse_resume_async(f"once:{tmp_path / 'marker'}".encode())
+
+    async def main():
+        return await asyncio.gather(resume_store.parse_resume_async(b"stuck"), innocent(), return_exceptions=True)
+
+    stuck, retried = asyncio.run(main())
+    assert isinstance(stuck, ValueError) and "too long" in str(stuck)
+    assert retried.text == "Jane Doe"
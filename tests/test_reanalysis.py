@@ -0,0 +1,96 @@
+# test_reanalysis.py
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+import local_checks
+from analysis import (ANALYSIS_CHAINS, ANALYSIS_CHANGE_THRESHOLD, SECTION_DEPENDENCIES, reanalyze_resume, run_pipeline,
+                      section_changes)
+from llm_client import LazyChain
+from resume_store import ParsedResume, hash_bytes
+from session_store import Session
+
+EDITS = 8
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Every section chain call, by output key, answered without an LLM."""
+    calls = Counter()
+
+    async def ainvoke(self, inputs):
+        calls[self.output_key] += 1
+        return {self.output_key: f"{self.output_key} #{calls[self.output_key]}"}
+
+    monkeypatch.setattr(LazyChain, "ainvoke", ainvoke)
+    monkeypatch.setattr(local_checks, "LOCAL_CHECKS", set())
+    return calls
+
+
+def resume_version(edits: int) -> ParsedResume:
+    """A resume whose experience section had its first `edits` bullets reworded."""
+    bullets = [f"Built the billing service number {i} and cut its latency by {i + 10} percent." for i in range(30)]
+    for i in range(edits):
+        bullets[i] = f"Shipped the invoicing pipeline number {i} and cut its latency by {i + 10} percent."
+    sections = {
+        "contact": "Jane Doe\njane@example.com | Boston, MA",
+        "summary": "Backend engineer with eight years of experience.",
+        "experience": "\n".join(bullets),
+        "skills": "Python, PostgreSQL, Docker",
+    }
+    text = "\n\n".join(sections.values())
+    return ParsedResume(content_hash=hash_bytes(text.encode()), text=text, page_count=1,
+                        token_estimate=len(text) // 4, sections=sections)
+
+
+async def upload_versions(calls: Counter) -> Session:
+    """Analyze the original resume, then re-analyze EDITS revisions incrementally, like /analyze."""
+    previous = Session(user_id="jane", resume=resume_version(0))
+    result = await run_pipeline(previous.resume.text, previous.resume.sections)
+    previous.remember_analysis({chain.output_key: result[chain.output_key] for chain in ANALYSIS_CHAINS}, "v1")
+    calls.clear()
+
+    for edits in range(1, EDITS + 1):
+        session = Session(user_id="jane", resume=resume_version(edits))
+        bases = {chain.output_key: previous.analysis_base(chain.output_key) for chain in ANALYSIS_CHAINS}
+        result, recomputed = await reanalyze_resume(
+            session.resume.text, session.resume.sections, (), bases, previous.analysis
+        )
+        reused = [chain.output_key for chain in ANALYSIS_CHAINS if chain.output_key not in recomputed]
+        outputs = {chain.output_key: result[chain.output_key] for chain in ANALYSIS_CHAINS}
+        session.remember_analysis(outputs, "v1", previous, reused)
+        previous = session
+    return previous
+
+
+def test_each_edit_is_below_the_threshold():
+    for edits in range(1, EDITS + 1):
+        change = section_changes(resume_version(edits - 1).sections, resume_version(edits).sections)
+        assert 0 < change["experience"] < ANALYSIS_CHANGE_THRESHOLD
+
+
+def test_small_edits_add_up_until_outputs_rerun(llm_calls):
+    session = asyncio.run(upload_versions(llm_calls))
+
+    # Spelling reruns on every change; the contact block never changed
+    assert llm_calls["spelling"] == EDITS
+    assert llm_calls["personal_info"] == 0
+    # The judgement outputs rerun once the edits since their own base add up, not on every edit
+    for key in ("summary", "rating", "job_roles", "strengths", "career_tips", "improvements"):
+        assert 1 <= llm_calls[key] < EDITS
+    assert sum(llm_calls.values()) < EDITS * len(ANALYSIS_CHAINS)
+
+    # No stored output drifted further than the threshold from the sections it reads
+    for chain in ANALYSIS_CHAINS:
+        _, base_sections = session.analysis_base(chain.output_key)
+        changes = section_changes(base_sections, session.resume.sections)
+        assert all(changes.get(name, 0) <= ANALYSIS_CHANGE_THRESHOLD for name in SECTION_DEPENDENCIES[chain.output_key])
+
+
+def test_reused_outputs_survive_a_round_trip(llm_calls):
+    session = asyncio.run(upload_versions(llm_calls))
+    restored = Session.from_json(session.to_json(), session.last_access)
+    for chain in ANALYSIS_CHAINS:
+        assert restored.analysis_base(chain.output_key) == session.analysis_base(chain.output_key)
@@ -0,0 +1,29 @@
+# test_restart.py
+
+MESSAGES = [
+    "What are the strongest parts of my resume?",
+    "How can I make my experience section more impactful?",
+    "Which skills should I learn next?",
+]
+
+
+def respond(app, message: str):
+    return app.post("/chatbot/respond", data={"user_id": "alice", "message": message})
+
+
+def test_conversation_survives_a_restart(fake_llm, start_app, resume_pdf):
+    app = start_app(fake_llm())
+    response = app.post("/chatbot/load", data={"user_id": "alice"}, files={"file": ("resume.pdf", resume_pdf)})
+    assert response.status_code == 200, response.text
+    for message in MESSAGES[:2]:
+        assert respond(app, message).status_code == 200
+
+    app.stop()
+    app.start()
+
+    # No re-upload: the session comes back from its checkpoint
+    response = respond(app, MESSAGES[2])
+    assert response.status_code == 200, response.text
+    history = app.post("/chatbot/export", data={"user_id": "alice"}).json()["history"]
+    assert len(history) == 2 * len(MESSAGES)
+    assert [content for role, content in history if role == "human"] == MESSAGES
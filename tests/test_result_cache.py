@@ -0,0 +1,38 @@
+# test_result_cache.py
+
+import asyncio
+
+from result_cache import ResultCache, cache_key
+
+
+def key(index: int) -> str:
+    return cache_key("analyze", "v1", f"resume {index}")
+
+
+def test_disk_tier_survives_a_restart_and_stays_bounded(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def fill():
+        cache = ResultCache(endpoints="analyze", path=path, disk_max_entries=3)
+        for index in range(5):
+            await cache.store("analyze", key(index), {"rating": index})
+        cache.close()
+
+    async def read_back():
+        cache = ResultCache(endpoints="analyze", path=path)
+        values = [await cache.lookup("analyze", key(index)) for index in range(5)]
+        cache.close()
+        return values, cache.stats()
+
+    asyncio.run(fill())
+    values, stats = asyncio.run(read_back())
+    assert values == [None, None, {"rating": 2}, {"rating": 3}, {"rating": 4}]
+    assert stats["hits"] == {"analyze": 3}
+    assert stats["misses"] == {"analyze": 2}
+
+
+def test_disabled_endpoints_never_touch_the_disk(tmp_path):
+    cache = ResultCache(endpoints="", path=str(tmp_path / "cache.db"))
+    asyncio.run(cache.store("analyze", key(0), {"rating": 0}))
+    assert asyncio.run(cache.lookup("analyze", key(0))) is None
+    assert not (tmp_path / "cache.db").exists()
@@ -0,0 +1,170 @@
+# test_session_store.py
+
+import gc
+import time
+import tracemalloc
+
+import pytest
+
+from resume_store import ParsedResume
+from session_store import (CheckpointsInUse, MemorySessionStore, Session, SessionCheckpoints, SessionStore,
+                           SQLiteSessionStore)
+
+
+USERS = 10_000
+RESUME_CHARS = 8_000
+BUDGET = 2 * 1024 * 1024
+
+
+def make_session(index: int) -> Session:
+    text = (f"Candidate {index} " + "Built and shipped data pipelines. " * 300)[:RESUME_CHARS]
+    resume = ParsedResume(content_hash=f"hash-{index}", text=text, page_count=1, token_estimate=len(text) // 4,
+                          sections={"experience": text})
+    return Session(user_id=f"user-{index}", resume=resume)
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    pytest.skip("resident memory is only read on Linux")
+
+
+def test_10k_users_stay_within_the_byte_budget():
+    store = MemorySessionStore(max_bytes=BUDGET, checkpoints=None)
+    tracemalloc.start()
+    try:
+        for index in range(USERS):
+            store.put(make_session(index))
+            if index == USERS // 5:
+                gc.collect()
+                filled = tracemalloc.get_traced_memory()[0]
+        gc.collect()
+        final = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    stats = store.stats()
+    offered = USERS * make_session(0).size_bytes()
+    assert stats["bytes"] <= BUDGET
+    assert stats["entries"] + stats["evictions"] == USERS
+    # Once the budget is full, more users only add tombstones (a user id each), not resumes
+    assert final - filled < offered / 50
+
+
+def test_10k_users_keep_resident_memory_bounded():
+    store = MemorySessionStore(max_bytes=BUDGET, checkpoints=None)
+    gc.collect()
+    start = rss_bytes()
+    for index in range(USERS):
+        store.put(make_session(index))
+    gc.collect()
+    offered = USERS * make_session(0).size_bytes()  # ~160 MB if nothing were evicted
+    assert rss_bytes() - start < offered / 8
+
+
+def test_evicted_users_are_told_apart_from_unknown_ones():
+    session = make_session(0)
+    store = MemorySessionStore(max_bytes=session.size_bytes() * 2, checkpoints=None)
+    for index in range(3):
+        store.put(make_session(index))
+
+    assert store.get("user-0") is None
+    assert store.was_evicted("user-0")
+    assert not store.was_evicted("user-never-seen")
+    assert store.get("user-2") is not None
+
+
+def test_idle_sessions_expire():
+    store = MemorySessionStore(ttl_seconds=0.05, checkpoints=None)
+    store.put(make_session(0))
+    time.sleep(0.1)
+
+    assert store.get("user-0") is None
+    assert store.was_evicted("user-0")
+    assert store.stats()["expirations"] == 1
+
+
+def test_checkpoints_are_written_in_the_background_and_flushed_on_close(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    checkpoints = SessionCheckpoints(path)
+    store = MemorySessionStore(checkpoints=checkpoints)
+    for index in range(3):
+        store.put(make_session(index))
+    checkpoints.delete("user-2")
+
+    # Queued changes are visible before the writer gets to them
+    assert checkpoints.load("user-0").resume.text == make_session(0).resume.text
+    assert checkpoints.load("user-2") is None
+    store.close()
+
+    reopened = SessionCheckpoints(path)
+    try:
+        assert reopened.load("user-1").resume.text == make_session(1).resume.text
+        assert reopened.load("user-2") is None
+    finally:
+        reopened.close()
+
+
+def test_backends_must_implement_the_whole_interface():
+    class GetOnlyStore(SessionStore):
+        def get(self, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
+
+
+def test_sqlite_reads_do_not_write(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.put(make_session(0))
+    writes = store._conn.total_changes
+    for _ in range(100):
+        assert store.get("user-0") is not None
+    assert store._conn.total_changes == writes
+    store.close()
+
+
+def test_sqlite_keeps_a_running_total_of_bytes(tmp_path):
+    session = make_session(0)
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_bytes=session.size_bytes() * 3)
+    for index in range(5):
+        store.put(make_session(index))
+    store.put(make_session(4))  # replacing a session doesn't count it twice
+
+    stats = store.stats()
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 2
+    assert stats["bytes"] == store._conn.execute("SELECT SUM(size) FROM sessions").fetchone()[0]
+    store.close()
+
+
+def test_checkpoint_file_belongs_to_one_process_at_a_time(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    checkpoints = SessionCheckpoints(path)
+    with pytest.raises(CheckpointsInUse):
+        SessionCheckpoints(path)
+    checkpoints.close()
+    SessionCheckpoints(path).close()
+
+
+def test_conversation_follows_the_resume_text_not_the_pdf():
+    session = make_session(0)
+    session.history = [{"type": "human", "data": {"type": "human", "content": "Hi"}},
+                       {"type": "ai", "data": {"type": "ai", "content": "Hello!"}}]
+    state = session.chat_state()
+
+    # The same text from a re-exported PDF (different bytes, so a different content hash)
+    reexported = Session(user_id="user-0", resume=ParsedResume(**{**vars(session.resume), "content_hash": "other"}))
+    reexported.restore_chat(state)
+    assert reexported.history == session.history
+
+    # Exports from before the format change named the resume by its PDF's hash
+    old_state = {**state, "format": 1, "resume_hash": session.resume.content_hash}
+    make_session(0).restore_chat(old_state)
+    with pytest.raises(ValueError):
+        reexported.restore_chat(old_state)
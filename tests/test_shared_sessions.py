@@ -0,0 +1,45 @@
+# test_shared_sessions.py
+
+
+MESSAGES = [
+    "What are the strongest parts of my resume?",
+    "How can I make my experience section more impactful?",
+    "Which skills should I learn next?",
+    "Can you suggest a better summary for me?",
+]
+
+
+def upload(app, user_id: str, pdf: bytes) -> None:
+    response = app.post("/chatbot/load", data={"user_id": user_id}, files={"file": ("resume.pdf", pdf)})
+    assert response.status_code == 200, response.text
+
+
+def test_requests_alternating_between_processes_keep_the_conversation(fake_llm, start_app, tmp_path, resume_pdf):
+    llm = fake_llm()
+    shared = {"SESSION_BACKEND": "sqlite", "SESSION_SQLITE_PATH": str(tmp_path / "sessions.db")}
+    workers = [start_app(llm, **shared), start_app(llm, **shared)]
+    assert workers[0].process.pid != workers[1].process.pid
+
+    upload(workers[0], "alice", resume_pdf)
+    for turn, message in enumerate(MESSAGES):
+        response = workers[(turn + 1) % 2].post("/chatbot/respond", data={"user_id": "alice", "message": message})
+        assert response.status_code == 200, response.text
+
+    for worker in workers:
+        state = worker.post("/chatbot/export", data={"user_id": "alice"}).json()
+        assert [content for role, content in state["history"] if role == "human"] == MESSAGES
+        assert len(state["history"]) == 2 * len(MESSAGES)
+
+
+def test_memory_backend_is_per_process(fake_llm, start_app, tmp_path, resume_pdf):
+    llm = fake_llm()
+    # Workers started with the same checkpoint file: only the first one checkpoints to it
+    shared = {"SESSION_CHECKPOINT_PATH": str(tmp_path / "checkpoints.db")}
+    workers = [start_app(llm, **shared), start_app(llm, **shared)]
+
+    upload(workers[0], "alice", resume_pdf)
+    upload(workers[1], "bob", resume_pdf)
+    response = workers[1].post("/chatbot/respond", data={"user_id": "alice", "message": MESSAGES[0]})
+    assert response.status_code == 404
+    response = workers[0].post("/chatbot/respond", data={"user_id": "bob", "message": MESSAGES[0]})
+    assert response.status_code == 404
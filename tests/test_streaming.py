@@ -0,0 +1,74 @@
+# test_streaming.py
+
+import json
+import time
+from typing import List, Tuple
+
+import pytest
+import requests
+
+# The fake LLM starts replying after LATENCY seconds, then sends one word every 1/TOKENS_PER_SECOND
+LATENCY = 0.1
+TOKENS_PER_SECOND = 20
+COMPLETION_TOKENS = 40
+FULL_REPLY_SECONDS = LATENCY + COMPLETION_TOKENS / TOKENS_PER_SECOND
+
+
+@pytest.fixture
+def app(fake_llm, start_app, resume_pdf):
+    llm = fake_llm(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND, completion_tokens=COMPLETION_TOKENS)
+    # Chains are built before serving, so the first request doesn't pay for importing LangChain
+    app = start_app(llm, LLM_WARMUP="startup")
+    response = app.post("/chatbot/load", data={"user_id": "alice"}, files={"file": ("resume.pdf", resume_pdf)})
+    assert response.status_code == 200, response.text
+    return app
+
+
+def read_events(app, path: str, data: dict) -> Tuple[float, float, List[Tuple[str, dict]]]:
+    """Seconds to the first token event and to the end of the stream, and every event received."""
+    start = time.perf_counter()
+    first_token = None
+    events = []
+    with requests.post(app.url + path, data=data, stream=True, timeout=60) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event = None
+        for line in response.iter_lines():
+            if line.startswith(b"event: "):
+                event = line[len(b"event: "):].decode()
+            elif line.startswith(b"data: "):
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                events.append((event, json.loads(line[len(b"data: "):])))
+    return first_token, time.perf_counter() - start, events
+
+
+def test_chat_stream_sends_tokens_before_the_reply_is_finished(app):
+    start = time.perf_counter()
+    response = app.post("/chatbot/respond", data={"user_id": "alice", "message": "Hi"})
+    blocking = time.perf_counter() - start
+    assert response.status_code == 200
+
+    ttfb, total, events = read_events(app, "/chatbot/respond/stream", {"user_id": "alice", "message": "And now?"})
+
+    assert blocking >= FULL_REPLY_SECONDS
+    assert total >= FULL_REPLY_SECONDS
+    assert ttfb < FULL_REPLY_SECONDS / 4
+    tokens = "".join(data["token"] for event, data in events if event == "token")
+    event, done = events[-1]
+    assert event == "done" and done["response"] == tokens
+    # The streamed prompt carries the first turn, so it is bigger than the blocking one
+    assert done["prompt_tokens"] > response.json()["prompt_tokens"]
+
+    # The streamed turn is in the conversation memory like a normal one
+    state = app.post("/chatbot/export", data={"user_id": "alice"}).json()
+    assert state["history"][-2:] == [["human", "And now?"], ["ai", tokens]]
+
+
+def test_revision_stream_sends_tokens_before_the_rewrite_is_finished(app):
+    ttfb, total, events = read_events(app, "/revision/stream", {"user_id": "alice"})
+
+    assert total >= FULL_REPLY_SECONDS
+    assert ttfb < FULL_REPLY_SECONDS / 4
+    assert sum(1 for event, _ in events if event == "token") == COMPLETION_TOKENS
+    assert events[-1] == ("done", {})
@@ -0,0 +1,58 @@
+# test_uploads.py
+
+import http.client
+import json
+import time
+from urllib.parse import urlparse
+
+from resume_store import MAX_UPLOAD_BYTES
+
+BOUNDARY = "resume-boundary"
+
+
+def multipart(user_id: str, pdf: bytes) -> bytes:
+    return b"".join([
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="user_id"\r\n\r\n{user_id}\r\n'.encode(),
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="resume.pdf"\r\n'.encode(),
+        b"Content-Type: application/pdf\r\n\r\n", pdf, f"\r\n--{BOUNDARY}--\r\n".encode(),
+    ])
+
+
+def connect(app) -> http.client.HTTPConnection:
+    url = urlparse(app.url)
+    return http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+
+
+def test_oversized_upload_is_rejected_before_its_body_is_sent(fake_llm, start_app):
+    app = start_app(fake_llm())
+    conn = connect(app)
+    conn.putrequest("POST", "/analyze")
+    conn.putheader("Content-Type", f"multipart/form-data; boundary={BOUNDARY}")
+    conn.putheader("Content-Length", str(50 * MAX_UPLOAD_BYTES))
+    conn.endheaders()
+
+    # Nothing of the body has been sent, yet the answer comes right away
+    start = time.perf_counter()
+    response = conn.getresponse()
+    assert time.perf_counter() - start < 5
+    assert response.status == 400
+    assert "too large" in json.loads(response.read())["detail"]
+
+
+def test_chunked_uploads_are_read_up_to_the_limit(fake_llm, start_app, resume_pdf):
+    app = start_app(fake_llm())
+
+    def post_chunked(body: bytes) -> http.client.HTTPResponse:
+        conn = connect(app)
+        chunks = (body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024))
+        conn.request("POST", "/chatbot/load", body=chunks, encode_chunked=True,
+                     headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+                              "Transfer-Encoding": "chunked"})
+        return conn.getresponse()
+
+    response = post_chunked(multipart("alice", resume_pdf))
+    assert response.status == 200, response.read()
+
+    response = post_chunked(multipart("bob", resume_pdf + b"\n%" * MAX_UPLOAD_BYTES))
+    assert response.status == 400
+    assert "too large" in json.loads(response.read())["detail"]